@@ -1,17 +1,39 @@
+import math
+import operator
+import random
+from itertools import count
+from time import perf_counter
+
+
 class BinaryHeap:
     """
     BinaryHeap() creates a new, empty, binary heap.
+    BinaryHeap(arity=d) creates a d-ary heap instead: a wider node means
+        fewer levels, so cheaper inserts, at the cost of more comparisons
+        per level in del_min.
+    BinaryHeap(key=f, reverse=True) orders items by f(item), computed once
+        on insertion and stored next to the item, largest key first when
+        reverse is set; items with equal keys come out in insertion order.
     insert(k) adds a new item to the heap.
     find_min() returns item with the min key value, leaving item in the heap.
     del_min() returns item with the min key value, removing item from the heap.
     is_empty() returns true if the heap is empty, false otherwise.
     size() returns the number of items in the heap.
     build_heap(list) builds a new heap from a list of keys.
+    merge(heap) moves every item of another BinaryHeap into this one.
     """
 
-    def __init__(self):
+    def __init__(self, arity=2, key=None, reverse=False):
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self.arity = arity
+        self.key = key
+        self.reverse = reverse
         self.heap_list = [0]
         self.current_size = 0
+        self._decorated = key is not None or reverse
+        self._lt = operator.gt if reverse else operator.lt
+        self._counter = count()
 
     def __repr__(self):
         return str(self.heap_list)
@@ -19,12 +41,52 @@ class BinaryHeap:
     def is_empty(self):
         return self.current_size == 0
 
+    def find_min(self):
+        return self.heap_list[1][-1] if self._decorated else self.heap_list[1]
+
     def insert(self, new_item):
-        self.heap_list.append(new_item)
+        self._push_entry(self._entry(new_item))
+
+    def del_min(self):
+        retrieve_value = self._pop_entry()
+        return retrieve_value[-1] if self._decorated else retrieve_value
+
+    def build_heap(self, alist):
+        self.current_size = len(alist)
+        self.heap_list = [0] + [self._entry(item) for item in alist]
+        self._heapify()
+
+    def merge(self, other):
+        """Move every item of other into this heap, leaving other empty.
+
+        Inserting m items one by one costs about m log(n + m) comparisons and
+        rebuilding the whole heap about n + m, so the cheaper of the two runs.
+        other must be a BinaryHeap; PairingHeap melds with its own meld().
+        """
+        if not isinstance(other, BinaryHeap):
+            raise TypeError("can only merge a BinaryHeap, not %s" % type(other).__name__)
+        if other is self:
+            return
+        entries = self._adopt(other)
+        other.heap_list, other.current_size = [0], 0
+        n, m = self.current_size, len(entries)
+        if m * math.log2(n + m + 1) < n + m:
+            for entry in entries:
+                self._push_entry(entry)
+        else:
+            self.heap_list.extend(entries)
+            self.current_size = n + m
+            self._heapify()
+
+    def size(self):
+        return self.current_size
+
+    def _push_entry(self, entry):
+        self.heap_list.append(entry)
         self.current_size += 1
         self.percolate_up(self.current_size)
 
-    def del_min(self):
+    def _pop_entry(self):
         retrieve_value = self.heap_list[1]
         self.heap_list[1] = self.heap_list[self.current_size]
         self.current_size -= 1
@@ -32,42 +94,383 @@ class BinaryHeap:
         self.percolate_down(1)
         return retrieve_value
 
-    def build_heap(self, alist):
-        i = len(alist) // 2
-        self.current_size = len(alist)
-        self.heap_list = [0] + alist[:]
+    def _replace_top(self, entry):
+        """Swap the top entry for entry with one percolate_down instead of a pop and a push."""
+        self.heap_list[1] = entry
+        self.percolate_down(1)
+
+    def _heapify(self):
+        i = self.parent(self.current_size)
         while i > 0:
             self.percolate_down(i)
             i -= 1
 
-    def size(self):
-        return self.current_size
+    def _entry(self, item):
+        return self._sort_key(item) + (item,) if self._decorated else item
+
+    def _items(self):
+        return [entry[-1] for entry in self._by_insertion()] if self._decorated else self.heap_list[1:]
+
+    def _by_insertion(self):
+        """Return the entries oldest first when they carry insertion numbers, else in heap order."""
+        if not self._decorated:
+            return self.heap_list[1:]
+        return sorted(self.heap_list[1:], key=self._tie_of, reverse=self.reverse)
+
+    @staticmethod
+    def _tie_of(entry):
+        return entry[1]
+
+    def _same_order(self, other):
+        return type(other) is type(self) and other.key is self.key and other.reverse == self.reverse
+
+    def _adopt(self, other):
+        """Return other's contents as entries of this heap, keeping keys already computed."""
+        if not self._same_order(other):
+            return [self._entry(item) for item in other._items()]
+        if self._decorated:
+            return [self._tie_break(entry[0]) + (entry[-1],) for entry in other._by_insertion()]
+        return other.heap_list[1:]
+
+    def _sort_key(self, item):
+        """Return what the heap orders item by: the item, or (key, insertion number).
+
+        The insertion number is negated under reverse so that the greater-than
+        comparison still releases equal keys first in, first out.
+        """
+        if not self._decorated:
+            return item
+        return self._tie_break(item if self.key is None else self.key(item))
+
+    def _tie_break(self, k):
+        n = next(self._counter)
+        return (k, -n) if self.reverse else (k, n)
+
+    # heap_list stays 1-based: the children of i are d*(i-1)+2 .. d*i+1
+    def parent(self, i):
+        return (i - 2) // self.arity + 1
+
+    def first_child(self, i):
+        return self.arity * (i - 1) + 2
 
     def percolate_up(self, i):
-        while i // 2 > 0:
-            if self.heap_list[i] < self.heap_list[i // 2]:
-                temp = self.heap_list[i // 2]
-                self.heap_list[i // 2] = self.heap_list[i]
-                self.heap_list[i] = temp
-            i //= 2
+        heap, lt = self.heap_list, self._lt
+        item = heap[i]
+        while i > 1:
+            p = (i - 2) // self.arity + 1
+            if not lt(item, heap[p]):
+                break
+            heap[i] = heap[p]
+            i = p
+        heap[i] = item
 
     def percolate_down(self, i):
-        while i*2 <= self.current_size:
+        if i > self.current_size:
+            return
+        heap, lt = self.heap_list, self._lt
+        item = heap[i]
+        while self.arity * (i - 1) + 2 <= self.current_size:
             mc = self.min_child(i)
-            if self.heap_list[i] > self.heap_list[mc]:
-                temp = self.heap_list[i]
-                self.heap_list[i] = self.heap_list[mc]
-                self.heap_list[mc] = temp
+            if not lt(heap[mc], item):
+                break
+            heap[i] = heap[mc]
             i = mc
+        heap[i] = item
 
     def min_child(self, i):
-        if i*2 + 1 > self.current_size:
-            return i*2
+        heap, lt = self.heap_list, self._lt
+        mc = self.arity * (i - 1) + 2
+        for c in range(mc + 1, min(mc + self.arity, self.current_size + 1)):
+            if lt(heap[c], heap[mc]):
+                mc = c
+        return mc
+
+
+class Handle:
+    """A reference to an item in an IndexedBinaryHeap, returned by insert."""
+
+    __slots__ = ("item", "_sort", "_index")
+
+    def __init__(self, item, sort, index):
+        self.item = item
+        self._sort = sort           # what the heap orders by, see _sort_key
+        self._index = index         # position in heap_list, 0 once removed
+
+    def __repr__(self):
+        return "Handle(%r)" % (self.item,)
+
+
+class IndexedBinaryHeap(BinaryHeap):
+    """
+    A BinaryHeap whose insert returns a Handle to the new item.
+
+    Every handle records its position in heap_list and percolate_up and
+    percolate_down keep it current, so an item can be re-prioritized or
+    removed in O(log n) instead of pushing a duplicate and skipping the
+    stale entry later.
+
+    decrease_key(h, item) moves the item behind handle h towards the front
+        (a smaller key, or a larger one when reverse is set).
+    increase_key(h, item) moves it towards the back.
+    update(h, item) replaces it with an item of any priority.
+    remove(h) deletes it from the heap and returns it.
+    """
+
+    def __repr__(self):
+        return str([h.item for h in self.heap_list[1:]])
+
+    def __contains__(self, handle):
+        return (isinstance(handle, Handle) and 0 < handle._index <= self.current_size
+                and self.heap_list[handle._index] is handle)
+
+    def find_min(self):
+        return self.heap_list[1].item
+
+    def insert(self, new_item):
+        handle = Handle(new_item, self._sort_key(new_item), self.current_size + 1)
+        self.heap_list.append(handle)
+        self.current_size += 1
+        self.percolate_up(self.current_size)
+        return handle
+
+    def del_min(self):
+        return self.remove(self.heap_list[1])
+
+    def build_heap(self, alist):
+        """Build the heap from alist and return the handles in alist's order."""
+        handles = [Handle(item, self._sort_key(item), 0) for item in alist]
+        self.current_size = len(handles)
+        self.heap_list = [0] + handles
+        self._heapify()
+        return handles
+
+    def decrease_key(self, handle, new_item):
+        self._validate(handle)
+        sort = self._sort_key(new_item)
+        if self._lt(self._key_of(handle._sort), self._key_of(sort)):
+            raise ValueError("new item would move back in the heap")
+        handle.item, handle._sort = new_item, sort
+        self.percolate_up(handle._index)
+
+    def increase_key(self, handle, new_item):
+        self._validate(handle)
+        sort = self._sort_key(new_item)
+        if self._lt(self._key_of(sort), self._key_of(handle._sort)):
+            raise ValueError("new item would move forward in the heap")
+        handle.item, handle._sort = new_item, sort
+        self.percolate_down(handle._index)
+
+    def update(self, handle, new_item):
+        self._validate(handle)
+        handle.item, handle._sort = new_item, self._sort_key(new_item)
+        self.percolate_up(handle._index)
+        self.percolate_down(handle._index)
+
+    def remove(self, handle):
+        self._validate(handle)
+        i = handle._index
+        last = self.heap_list.pop()
+        self.current_size -= 1
+        if last is not handle:
+            self.heap_list[i] = last
+            last._index = i
+            self.percolate_up(i)
+            self.percolate_down(last._index)
+        handle._index = 0
+        return handle.item
+
+    def percolate_up(self, i):
+        heap, lt = self.heap_list, self._lt
+        handle = heap[i]
+        while i > 1:
+            p = (i - 2) // self.arity + 1
+            parent = heap[p]
+            if not lt(handle._sort, parent._sort):
+                break
+            heap[i] = parent
+            parent._index = i
+            i = p
+        heap[i] = handle
+        handle._index = i
+
+    def percolate_down(self, i):
+        heap, lt = self.heap_list, self._lt
+        handle = heap[i]
+        while self.arity * (i - 1) + 2 <= self.current_size:
+            mc = self.min_child(i)
+            child = heap[mc]
+            if not lt(child._sort, handle._sort):
+                break
+            heap[i] = child
+            child._index = i
+            i = mc
+        heap[i] = handle
+        handle._index = i
+
+    def min_child(self, i):
+        heap, lt = self.heap_list, self._lt
+        mc = self.arity * (i - 1) + 2
+        for c in range(mc + 1, min(mc + self.arity, self.current_size + 1)):
+            if lt(heap[c]._sort, heap[mc]._sort):
+                mc = c
+        return mc
+
+    def _heapify(self):
+        for i, handle in enumerate(self.heap_list[1:], 1):
+            handle._index = i
+        super()._heapify()
+
+    def _items(self):
+        return [handle.item for handle in self._by_insertion()]
+
+    @staticmethod
+    def _tie_of(handle):
+        return handle._sort[1]
+
+    def _adopt(self, other):
+        """Return other's contents as handles of this heap; other's handles stay valid."""
+        if not self._same_order(other):
+            return [Handle(item, self._sort_key(item), 0) for item in other._items()]
+        handles = other._by_insertion()
+        if self._decorated:
+            for handle in handles:
+                handle._sort = self._tie_break(handle._sort[0])
+        return handles
+
+    def _key_of(self, sort):
+        return sort[0] if self._decorated else sort
+
+    def _validate(self, handle):
+        if handle not in self:
+            raise ValueError("handle does not belong to this heap")
+
+
+def shortest_paths(graph, source):
+    """Return Dijkstra distances from source; graph maps a node to (neighbor, weight) pairs."""
+    dist = {source: 0}
+    heap = IndexedBinaryHeap()
+    handles = {source: heap.insert((0, source))}
+    while not heap.is_empty():
+        d, node = heap.del_min()
+        for neighbor, weight in graph.get(node, ()):
+            nd = d + weight
+            if neighbor not in dist:
+                dist[neighbor] = nd
+                handles[neighbor] = heap.insert((nd, neighbor))
+            elif nd < dist[neighbor] and handles[neighbor] in heap:
+                dist[neighbor] = nd
+                heap.decrease_key(handles[neighbor], (nd, neighbor))
+    return dist
+
+
+def _select(k, iterable, key, largest):
+    """Keep the k best items of iterable in a heap whose top is the worst of them.
+
+    Entries are (key, tie, item) with the tie making later items the first
+    evicted among equal keys, so the result matches a stable sort.
+    """
+    heap = BinaryHeap(reverse=not largest)
+    lt, heap_list = heap._lt, heap.heap_list
+    for n, item in enumerate(iterable):
+        k_item = item if key is None else key(item)
+        if heap.current_size < k:
+            heap._push_entry((k_item, -n if largest else n, item))
+        elif lt(heap_list[1][0], k_item):
+            heap._replace_top((k_item, -n if largest else n, item))
+    best = []
+    while heap.current_size:
+        best.append(heap._pop_entry()[-1])
+    return reversed(best)
+
+
+def nsmallest(k, iterable, key=None):
+    """Yield the k smallest items of iterable in order, holding only k of them at a time.
+
+    Equivalent to sorted(iterable, key=key)[:k].
+    """
+    if k > 0:
+        yield from _select(k, iterable, key, largest=False)
+
+
+def nlargest(k, iterable, key=None):
+    """Yield the k largest items of iterable, largest first, holding only k of them at a time.
+
+    Equivalent to sorted(iterable, key=key, reverse=True)[:k].
+    """
+    if k > 0:
+        yield from _select(k, iterable, key, largest=True)
+
+
+def merge(*iterables, key=None, reverse=False):
+    """Lazily merge sorted iterables into one sorted stream, holding one item per run.
+
+    Items that compare equal come out in the order of the iterables they were
+    drawn from. With reverse=True each input must be sorted largest first.
+    """
+    heap = BinaryHeap(reverse=reverse)
+    for i, it in enumerate(map(iter, iterables)):
+        for item in it:
+            heap._push_entry((item if key is None else key(item), -i if reverse else i, item, it))
+            break
+    heap_list = heap.heap_list
+    while heap.current_size > 1:
+        _, tie, item, it = heap_list[1]
+        yield item
+        for item in it:
+            heap._replace_top((item if key is None else key(item), tie, item, it))
+            break
         else:
-            if self.heap_list[i*2] < self.heap_list[i*2+1]:
-                return i*2
-            else:
-                return i*2 + 1
+            heap._pop_entry()
+    if heap.current_size:
+        _, _, item, it = heap_list[1]
+        yield item
+        yield from it
+
+
+class _Counted:
+    """An int wrapper that counts the comparisons made on it."""
+
+    comparisons = 0
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        _Counted.comparisons += 1
+        return self.value < other.value
+
+
+def compare_arity(sizes=(1000, 10000, 100000), arities=(2, 3, 4, 8), pops=0.5):
+    """Time n inserts followed by pops * n del_min calls for each arity.
+
+    Prints seconds and comparisons per phase, which shows where a wider
+    heap stops paying for itself as the workload shifts towards del_min.
+    """
+    print("%8s %5s %10s %12s %10s %12s" % ("n", "arity", "insert s", "insert cmp", "pop s", "pop cmp"))
+    for n in sizes:
+        data = [random.random() for _ in range(n)]
+        for arity in arities:
+            bh = BinaryHeap(arity)
+            start = perf_counter()
+            for x in data:
+                bh.insert(x)
+            insert_time = perf_counter() - start
+            start = perf_counter()
+            for _ in range(int(n * pops)):
+                bh.del_min()
+            pop_time = perf_counter() - start
+
+            bh = BinaryHeap(arity)
+            _Counted.comparisons = 0
+            for x in data:
+                bh.insert(_Counted(x))
+            insert_cmp, _Counted.comparisons = _Counted.comparisons, 0
+            for _ in range(int(n * pops)):
+                bh.del_min()
+            print("%8d %5d %10.4f %12d %10.4f %12d"
+                  % (n, arity, insert_time, insert_cmp, pop_time, _Counted.comparisons))
 
 
 def main():
@@ -76,6 +479,31 @@ def main():
     bh.build_heap(my_list)
     print(bh)
 
+    ih = IndexedBinaryHeap()
+    handles = [ih.insert(x) for x in my_list]
+    ih.decrease_key(handles[3], -1)
+    ih.remove(handles[0])
+    print(ih, ih.find_min())
+
+    graph = {"a": [("b", 7), ("c", 9), ("f", 14)], "b": [("c", 10), ("d", 15)],
+             "c": [("d", 11), ("f", 2)], "d": [("e", 6)], "f": [("e", 9)]}
+    print(shortest_paths(graph, "a"))
+
+    from structures.queues import Golfer
+    leaders = BinaryHeap(key=operator.attrgetter("score"))
+    for name, score in [("Tiger Woods", 61), ("Phil Mickelson", 72), ("Zemene Muche", 61), ("Hal Sutton", 69)]:
+        leaders.insert(Golfer(name, score))
+    print([leaders.del_min() for _ in range(leaders.size())])
+    tallest = BinaryHeap(key=len, reverse=True)
+    tallest.build_heap(["ab", "abcd", "xy", "a", "wxyz"])
+    print([tallest.del_min() for _ in range(tallest.size())])
+
+    print(list(nsmallest(3, (random.randrange(1000) for _ in range(100000)))))
+    print(list(nlargest(2, ["ab", "abcd", "xy", "a", "wxyz"], key=len)))
+    print(list(merge([1, 4, 9], [2, 3, 10], [], [0, 11])))
+
+    # compare_arity()
+
 
 if __name__ == '__main__':
     main()
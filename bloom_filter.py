@@ -0,0 +1,111 @@
+import math
+
+
+_MASK32 = (1 << 32) - 1
+_MASK64 = (1 << 64) - 1
+
+
+def mix_hash(h):
+    """Return h run through the MurmurHash3 finalizer, as a signed 64-bit int.
+
+    The finalizer spreads low-entropy hashes such as consecutive ints
+    across all 64 bits, so any slice of the bits is usable as an index.
+    """
+    h &= _MASK64
+    h ^= h >> 33
+    h = (h * 0xff51afd7ed558ccd) & _MASK64
+    h ^= h >> 33
+    h = (h * 0xc4ceb9fe1a85ec53) & _MASK64
+    h ^= h >> 33
+    return h - (1 << 64) if h >> 63 else h
+
+
+class BloomFilter:
+    """
+    A bit array answering "definitely absent" or "probably present".
+
+    The filter is sized for capacity items at the given false-positive rate.
+    The num_hashes bit positions of an item are derived from one mixed 64-bit
+    hash by double hashing, so callers that already hold such a hash can use
+    add_hash/contains_hash and skip rehashing.
+
+    Methods:
+        add(item)
+        add_many(items)
+        contains_many(items)
+        add_hash(hash_value)
+        contains_hash(hash_value)
+        clear()
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+        self._count = 0
+
+    def __repr__(self):
+        return "BloomFilter(capacity=%d, error_rate=%g)" % (self._capacity, self._error_rate)
+
+    def __len__(self):
+        """Return the number of add calls, counting repeats."""
+        return self._count
+
+    def __contains__(self, item):
+        return self.contains_hash(mix_hash(hash(item)))
+
+    @property
+    def num_bits(self):
+        return self._num_bits
+
+    @property
+    def num_hashes(self):
+        return self._num_hashes
+
+    def add(self, item):
+        self.add_hash(mix_hash(hash(item)))
+
+    def add_many(self, items):
+        for item in items:
+            self.add_hash(mix_hash(hash(item)))
+
+    def contains_many(self, items):
+        """Return a list with, for each item, whether it may have been added."""
+        return [self.contains_hash(mix_hash(hash(item))) for item in items]
+
+    def add_hash(self, hash_value):
+        bits = self._bits
+        position, step, m = hash_value & _MASK32, (hash_value >> 32) & _MASK32 | 1, self._num_bits
+        for _ in range(self._num_hashes):
+            position %= m
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+        self._count += 1
+
+    def contains_hash(self, hash_value):
+        bits = self._bits
+        position, step, m = hash_value & _MASK32, (hash_value >> 32) & _MASK32 | 1, self._num_bits
+        for _ in range(self._num_hashes):
+            position %= m
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self._count = 0
+
+
+if __name__ == "__main__":
+    seen = BloomFilter(1000, error_rate=0.01)
+    seen.add_many("record-%d" % i for i in range(1000))
+    print(seen, seen.num_bits, seen.num_hashes)
+    print(all(seen.contains_many("record-%d" % i for i in range(1000))))
+    print(sum(seen.contains_many("other-%d" % i for i in range(10000))) / 10000)
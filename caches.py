@@ -0,0 +1,476 @@
+import sys
+from functools import wraps
+from time import monotonic
+
+from structures.hash_table import HashTable
+from structures.linked_lists import DoublyList
+
+
+class _Entry:
+    __slots__ = ("key", "value", "size", "expires")
+
+    def __init__(self, key, value, size, expires=None):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+    def __repr__(self):
+        return "%r: %r" % (self.key, self.value)
+
+
+class _RecencyList(DoublyList):
+    """A DoublyList whose nodes are handed out so they can be moved or unlinked in O(1)."""
+
+    def push(self, item):
+        """Add item at the most recent end and return its node."""
+        return self._insert_between(item, self._trailer.prev, self._trailer)
+
+    def touch(self, node):
+        """Relink node at the most recent end."""
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        node.prev = self._trailer.prev
+        node.next = self._trailer
+        self._trailer.prev.next = node
+        self._trailer.prev = node
+
+    def insert_after(self, node, item):
+        """Add item right after node (or at the front if node is None) and return its node."""
+        node = self._header if node is None else node
+        return self._insert_between(item, node, node.next)
+
+    def unlink(self, node):
+        return self._delete_node(node)
+
+    def oldest(self):
+        return self._header.next
+
+    def following(self, node):
+        """Return the node after node, or None at the end."""
+        return None if node.next is self._trailer else node.next
+
+    def nodes(self):
+        node = self._header.next
+        while node is not self._trailer:
+            successor = node.next       # node may be unlinked by the caller
+            yield node
+            node = successor
+
+
+class LRUCache:
+    """
+    A cache evicting the least recently used entry once max_entries or
+    max_bytes is exceeded. A HashTable maps each key to its node in a
+    DoublyList kept in recency order, so get, put and eviction are O(1).
+
+    Entry sizes come from sizeof(value) and only matter when max_bytes is
+    set; a value larger than max_bytes on its own is not cached.
+
+    Methods:
+        get(key[, default])
+        put(key, value)
+        pop(key[, default])
+        clear()
+        stats()
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=sys.getsizeof):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be positive")
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._table = HashTable()
+        self._order = _RecencyList()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self._order)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, key):
+        """Return whether key is cached, without counting a hit or refreshing it."""
+        node = self._table.get(key)
+        return node is not None and not self._expired(node)
+
+    def __getitem__(self, key):
+        node = self._lookup(key)
+        if node is None:
+            raise KeyError(key)
+        return node.item.value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        node = self._table.pop(key)
+        self._unlink(node)
+
+    @property
+    def current_bytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        node = self._lookup(key)
+        if node is None:
+            return default
+        return node.item.value
+
+    def put(self, key, value):
+        self._store(key, value, None)
+
+    def pop(self, key, *default):
+        node = self._table.get(key)
+        if node is not None and self._expired(node):
+            self._remove_expired(node)
+            node = None
+        if node is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._table.pop(key)
+        self._unlink(node)
+        return node.item.value
+
+    def clear(self):
+        self._table = HashTable()
+        self._order = _RecencyList()
+        self._bytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self), "bytes": self._bytes}
+
+    def _lookup(self, key):
+        """Return the live node for key, refreshed and counted as a hit, or None."""
+        node = self._table.get(key)
+        if node is None or self._expired(node):
+            if node is not None:
+                self._remove_expired(node)
+            self.misses += 1
+            return None
+        self._order.touch(node)
+        self.hits += 1
+        return node
+
+    def _store(self, key, value, expires):
+        size = self._sizeof(value) if self._max_bytes is not None else 0
+        node = self._table.pop(key, None)
+        if node is not None:
+            self._unlink(node)
+        if self._max_bytes is not None and size > self._max_bytes:
+            return
+        self._table.put(key, self._order.push(_Entry(key, value, size, expires)))
+        self._bytes += size
+        while ((self._max_entries is not None and len(self._table) > self._max_entries)
+               or (self._max_bytes is not None and self._bytes > self._max_bytes)):
+            self._evict()
+
+    def _evict(self):
+        node = self._order.oldest()
+        self._table.pop(node.item.key)
+        self._unlink(node)
+        self.evictions += 1
+
+    def _unlink(self, node):
+        self._order.unlink(node)
+        self._bytes -= node.item.size
+
+    def _expired(self, node):
+        return False
+
+    def _remove_expired(self, node):
+        self._table.pop(node.item.key)
+        self._unlink(node)
+
+
+class TTLCache(LRUCache):
+    """
+    An LRUCache whose entries also expire ttl seconds after they are stored.
+    Expired entries count as misses and are dropped when next looked up;
+    expire() sweeps all of them at once.
+    """
+
+    def __init__(self, ttl, max_entries=None, max_bytes=None, sizeof=sys.getsizeof,
+                 timer=monotonic):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        LRUCache.__init__(self, max_entries, max_bytes, sizeof)
+        self._ttl = ttl
+        self._timer = timer
+        self.expirations = 0
+
+    def put(self, key, value, ttl=None):
+        """Store value under key for ttl seconds, defaulting to the cache's ttl."""
+        self._store(key, value, self._timer() + (self._ttl if ttl is None else ttl))
+
+    def expire(self):
+        """Drop every expired entry and return how many there were."""
+        now = self._timer()
+        expired = [node for node in self._table.values() if node.item.expires <= now]
+        for node in expired:
+            self._remove_expired(node)
+        return len(expired)
+
+    def stats(self):
+        stats = LRUCache.stats(self)
+        stats["expirations"] = self.expirations
+        return stats
+
+    def _expired(self, node):
+        return node.item.expires <= self._timer()
+
+    def _remove_expired(self, node):
+        LRUCache._remove_expired(self, node)
+        self.expirations += 1
+
+
+class _Bucket:
+    __slots__ = ("count", "entries")
+
+    def __init__(self, count):
+        self.count = count
+        self.entries = _RecencyList()
+
+    def __repr__(self):
+        return "%d: %r" % (self.count, self.entries)
+
+
+class _CountedEntry:
+    __slots__ = ("key", "value", "bucket", "node")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.bucket = None          # node of the _Bucket in the bucket list
+        self.node = None            # node of this entry in the bucket's entries
+
+    def __repr__(self):
+        return "%r: %r" % (self.key, self.value)
+
+
+class LFUCache:
+    """
+    A cache evicting the least frequently used entry, oldest first among
+    equals, once it holds max_entries. A HashTable maps keys to entries; a
+    DoublyList of frequency buckets in increasing count order each holds a
+    DoublyList of its entries, so get, put and eviction are O(1).
+
+    With decay_interval set, every decay_interval gets and puts halve all
+    counts, so keys that were hot once but no longer are eventually evicted.
+    The sweep is O(n); an interval of at least max_entries keeps it
+    amortized O(1). Entries from merged buckets keep their relative order,
+    the formerly hotter ones counting as more recent.
+
+    Methods:
+        get(key[, default])
+        put(key, value)
+        pop(key[, default])
+        stats()
+    """
+
+    def __init__(self, max_entries, decay_interval=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if decay_interval is not None and decay_interval < 1:
+            raise ValueError("decay_interval must be positive")
+        self._max_entries = max_entries
+        self._decay_interval = decay_interval
+        self._operations = 0
+        self._table = HashTable()
+        self._buckets = _RecencyList()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "LFUCache(%r)" % (self._buckets,)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, key):
+        return key in self._table
+
+    def __getitem__(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        self._detach(self._table.pop(key))
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        return default if entry is None else entry.value
+
+    def put(self, key, value):
+        entry = self._table.get(key)
+        if entry is not None:
+            entry.value = value
+            self._increment(entry)
+        else:
+            if len(self._table) >= self._max_entries:
+                self._evict()
+            entry = _CountedEntry(key, value)
+            first = self._buckets.oldest() if len(self._buckets) else None
+            if first is None or first.item.count != 1:
+                first = self._buckets.insert_after(None, _Bucket(1))
+            self._attach(entry, first)
+            self._table.put(key, entry)
+        self._tick()
+
+    def pop(self, key, *default):
+        entry = self._table.pop(key, None)
+        if entry is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._detach(entry)
+        return entry.value
+
+    def frequency(self, key):
+        """Return the current use count of key, or 0 if it is not cached."""
+        entry = self._table.get(key)
+        return 0 if entry is None else entry.bucket.item.count
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self)}
+
+    def _lookup(self, key):
+        entry = self._table.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._increment(entry)
+        self._tick()
+        return entry
+
+    def _increment(self, entry):
+        """Move entry to the bucket one count higher, creating it if needed."""
+        bucket = entry.bucket
+        count = bucket.item.count + 1
+        target = self._buckets.following(bucket)
+        if target is None or target.item.count != count:
+            target = self._buckets.insert_after(bucket, _Bucket(count))
+        self._detach(entry)
+        self._attach(entry, target)
+
+    def _evict(self):
+        entry = self._buckets.oldest().item.entries.oldest().item
+        self._table.pop(entry.key)
+        self._detach(entry)
+        self.evictions += 1
+
+    def _attach(self, entry, bucket):
+        entry.bucket = bucket
+        entry.node = bucket.item.entries.push(entry)
+
+    def _detach(self, entry):
+        """Unlink entry from its bucket, dropping the bucket once it is empty."""
+        entries = entry.bucket.item.entries
+        entries.unlink(entry.node)
+        if not len(entries):
+            self._buckets.unlink(entry.bucket)
+
+    def _tick(self):
+        if self._decay_interval is None:
+            return
+        self._operations += 1
+        if self._operations >= self._decay_interval:
+            self._operations = 0
+            self._decay()
+
+    def _decay(self):
+        """Halve every count, merging buckets that end up with equal counts."""
+        previous = None
+        for bucket in self._buckets.nodes():
+            bucket.item.count = max(1, bucket.item.count // 2)
+            if previous is not None and previous.item.count == bucket.item.count:
+                for node in bucket.item.entries.nodes():
+                    entry = node.item
+                    bucket.item.entries.unlink(node)
+                    self._attach(entry, previous)
+                self._buckets.unlink(bucket)
+            else:
+                previous = bucket
+
+
+def hit_ratio(cache, trace, load=None):
+    """Replay trace through cache, storing load(key) (or key) on each miss.
+
+    Return the fraction of lookups that hit.
+    """
+    hits = lookups = 0
+    missing = object()
+    for key in trace:
+        lookups += 1
+        if cache.get(key, missing) is missing:
+            cache.put(key, key if load is None else load(key))
+        else:
+            hits += 1
+    return hits / lookups if lookups else 0.0
+
+
+_KWARGS_MARK = object()     # separates positional from keyword arguments in memoize keys
+
+
+def memoize(max_entries=128, max_bytes=None, ttl=None):
+    """Decorator caching a function's results by its (hashable) arguments.
+
+    Uses a TTLCache when ttl is given and an LRUCache otherwise; the cache
+    is exposed as the wrapper's cache attribute.
+    """
+    def decorator(function):
+        if ttl is None:
+            cache = LRUCache(max_entries, max_bytes)
+        else:
+            cache = TTLCache(ttl, max_entries, max_bytes)
+        missing = object()
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            key = args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items())) if kwargs else args
+            result = cache.get(key, missing)
+            if result is missing:
+                result = function(*args, **kwargs)
+                cache.put(key, result)
+            return result
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    cache = LRUCache(max_entries=3)
+    for word in "one two three".split():
+        cache[word] = len(word)
+    cache.get("one")
+    cache["four"] = 4
+    print(cache, "two" in cache, cache.stats())
+
+    @memoize(max_entries=100)
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    print(fib(80), fib.cache.stats())
+
+    lfu = LFUCache(max_entries=3)
+    for word in "one one one two two three four".split():
+        if lfu.get(word) is None:
+            lfu.put(word, len(word))
+    print(lfu, lfu.stats())
@@ -1,70 +1,692 @@
 import ctypes
-from time import time
+import math
+import mmap
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from time import perf_counter, time
+
+
+# buffer format characters by kind: signed, unsigned or floating point
+_FORMAT_KINDS = dict.fromkeys("bhilqn", "i")
+_FORMAT_KINDS.update(dict.fromkeys("BHILQN", "u"))
+_FORMAT_KINDS.update(dict.fromkeys("fd", "f"))
+
+
+class GrowthPolicy(ABC):
+    """How a DynamicArray picks its capacity when it fills up or empties out."""
+
+    @abstractmethod
+    def grow(self, capacity, needed):
+        """Return the new capacity, at least needed, for a full array."""
+
+    def shrink(self, capacity, n):
+        """Return a smaller capacity once n elements rattle around, or None to keep it."""
+        return None
+
+
+class GeometricGrowth(GrowthPolicy):
+    """Multiply the capacity by factor; shrink once the fill drops below shrink_below.
+
+    Shrinking leaves the array 1/factor full, so shrink_below must be less
+    than 1/factor for a grow right after a shrink to need real appends.
+    """
+
+    def __init__(self, factor=2.0, shrink_below=0.25):
+        if factor <= 1:
+            raise ValueError("factor must be greater than 1")
+        if shrink_below is not None and not 0 < shrink_below < 1 / factor:
+            raise ValueError("shrink_below must be between 0 and 1/factor")
+        self.factor = factor
+        self.shrink_below = shrink_below
+
+    def __repr__(self):
+        return "GeometricGrowth(%r, %r)" % (self.factor, self.shrink_below)
+
+    def grow(self, capacity, needed):
+        return max(needed, math.ceil(capacity * self.factor))
+
+    def shrink(self, capacity, n):
+        if self.shrink_below is None or n >= capacity * self.shrink_below:
+            return None
+        return max(1, math.ceil(n * self.factor))
+
+
+class AdditiveGrowth(GrowthPolicy):
+    """Add step slots at a time; shrink once more than two steps sit unused."""
+
+    def __init__(self, step=1024):
+        if step < 1:
+            raise ValueError("step must be positive")
+        self.step = step
+
+    def __repr__(self):
+        return "AdditiveGrowth(%r)" % self.step
+
+    def grow(self, capacity, needed):
+        return max(needed, capacity + self.step)
+
+    def shrink(self, capacity, n):
+        if capacity - n <= 2 * self.step:
+            return None
+        return n + self.step
+
+
+class OverallocatingGrowth(GrowthPolicy):
+    """CPython's list policy: about 12.5% headroom, shrinking below half full."""
+
+    def __repr__(self):
+        return "OverallocatingGrowth()"
+
+    def grow(self, capacity, needed):
+        return max(needed, (needed + (needed >> 3) + 6) & ~3)
+
+    def shrink(self, capacity, n):
+        if n >= capacity // 2:
+            return None
+        return max(1, (n + (n >> 3) + 6) & ~3)
 
 
 class DynamicArray:
-    """A dynamic array class akin to a simplified Python list."""
+    """A dynamic array class akin to a simplified Python list.
 
-    def __init__(self):
-        """Create an empty array."""
+    By default it holds references to arbitrary Python objects in a
+    pre-sized list used as a fixed block of slots. Given a dtype (an
+    array-module typecode such as 'd' or 'q') it instead stores raw C values
+    in one contiguous ctypes buffer, which view(), NumPy and, on Python
+    3.12+, memoryview() expose without copying.
+
+    Shifts for insertions and deletions move whole blocks: list insert and
+    del (a C memmove of the pointers) or ctypes.memmove, never a Python
+    loop over the elements.
+
+    A GrowthPolicy decides how far to grow when the array fills and when to
+    shrink after removals; the default doubles and halves below a quarter
+    full. reserve() and shrink_to_fit() set the capacity explicitly.
+    """
+
+    CTYPES = {
+        "b": ctypes.c_int8, "B": ctypes.c_uint8,
+        "h": ctypes.c_int16, "H": ctypes.c_uint16,
+        "i": ctypes.c_int32, "I": ctypes.c_uint32,
+        "q": ctypes.c_int64, "Q": ctypes.c_uint64,
+        "f": ctypes.c_float, "d": ctypes.c_double,
+    }
+
+    def __init__(self, dtype=None, growth=None, capacity=1):
+        """Create an empty array, of Python objects or of the given C type."""
+        if dtype is not None and dtype not in self.CTYPES:
+            raise ValueError("dtype must be one of %s" % "".join(self.CTYPES))
+        self._dtype = dtype
+        self._ctype = None if dtype is None else self.CTYPES[dtype]
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self._growth = GeometricGrowth() if growth is None else growth
         self._n = 0                 # Count actual elements
-        self._capacity = 1          # default array capacity
+        self._capacity = capacity   # default array capacity 1
         self._A = self._make_array(self._capacity)  # low-level array
 
     def __str__(self):
         return str(self._A)
 
+    def __buffer__(self, flags):
+        """Export the live elements of a typed array (PEP 688, Python 3.12+)."""
+        return self.view()
+
+    @property
+    def __array_interface__(self):
+        """Let NumPy wrap the elements of a typed array without copying, on any Python."""
+        if self._dtype is None:
+            raise AttributeError("only typed arrays expose a buffer")
+        size = ctypes.sizeof(self._ctype)
+        order = "|" if size == 1 else "<" if sys.byteorder == "little" else ">"
+        data = memoryview(self._A).cast("B")    # keeps this block alive if the array regrows
+        return {
+            "version": 3,
+            "shape": (self._n,),
+            "typestr": "%s%s%d" % (order, _FORMAT_KINDS[self._dtype], size),
+            "data": data.toreadonly() if getattr(self, "_readonly", False) else data,
+        }
+
     def __len__(self):
         """Return the number of elements stored in the array."""
         return self._n
 
     def __getitem__(self, k):
-        """Return element at index k."""
+        """Return element at index k, or a new array for a slice."""
+        if isinstance(k, slice):
+            start, stop, step = k.indices(self._n)
+            result = DynamicArray(self._dtype)
+            count = len(range(start, stop, step))
+            result._resize(max(count, 1))
+            if step == 1 and self._dtype is not None:
+                result._copy(self._A, start, result._A, 0, count)
+            elif count:                     # index by range: a negative stop is not an end index
+                result._A[:count] = [self._A[j] for j in range(start, stop, step)]
+            result._n = count
+            return result
+        if k < 0:
+            k += self._n
         if not 0 <= k < self._n:
             raise IndexError("Invalid index")
         return self._A[k]                       # retrieve from array
 
+    def __setitem__(self, k, value):
+        """Set element k, or replace a slice with the elements of value."""
+        if isinstance(k, slice):
+            start, stop, step = k.indices(self._n)
+            if step != 1:
+                value = list(value)
+                positions = range(start, stop, step)
+                if len(value) != len(positions):
+                    raise ValueError("extended slice assignment needs a sequence of the same length")
+                for j, item in zip(positions, value):
+                    self._A[j] = item
+                return
+            stop = max(start, stop)
+            items, count = self._block(value)
+            self._make_room(stop, count - (stop - start))
+            self._write(start, items, count)
+            return
+        if k < 0:
+            k += self._n
+        if not 0 <= k < self._n:
+            raise IndexError("Invalid index")
+        self._A[k] = value
+
+    def __delitem__(self, k):
+        """Delete element k or a slice, closing the gap with one block move."""
+        if isinstance(k, slice):
+            start, stop, step = k.indices(self._n)
+            if step != 1:
+                doomed = set(range(start, stop, step))
+                kept = [self._A[j] for j in range(self._n) if j not in doomed]
+                self._close_gap(0, self._n - len(kept))
+                if kept:
+                    self._A[:len(kept)] = kept
+                return
+            if stop > start:
+                self._close_gap(start, stop - start)
+            return
+        if k < 0:
+            k += self._n
+        if not 0 <= k < self._n:
+            raise IndexError("Invalid index")
+        self._close_gap(k, 1)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def itemsize(self):
+        return ctypes.sizeof(ctypes.py_object if self._ctype is None else self._ctype)
+
+    def view(self):
+        """Return a zero-copy memoryview of the elements of a typed array.
+
+        The view stays valid after the array grows, but then no longer
+        reflects it; take a fresh view after appending.
+        """
+        if self._dtype is None:
+            raise TypeError("only typed arrays expose a buffer")
+        return memoryview(self._A).cast("B").cast(self._dtype)[:self._n]
+
     def append(self, obj):
         """Add object to end of the array"""
         if self._n == self._capacity:           # not enough room
-            self._resize(2 * self._capacity)    # double capacity
+            self._resize(self._growth.grow(self._capacity, self._n + 1))
         self._A[self._n] = obj
         self._n += 1
 
+    def extend(self, iterable):
+        """Append every element of iterable, growing at most once when its length is known."""
+        items, count = self._block(iterable)
+        self._make_room(self._n, count)
+        self._write(self._n - count, items, count)
+
     def insert(self, k, value):
         """Insert value at index k, shifting subsequent values rightward."""
-        # for simplicity, we assume 0 <= k <= n in this version
-        if self._n == self._capacity:           # not enough room
-            self._resize(2 * self._capacity)    # so double capacity
-        for j in range(self._n, k, -1):         # shift rightmost first
-            self._A[j] = self._A[j-1]
+        if k < 0:
+            k += self._n
+        if not 0 <= k <= self._n:
+            raise IndexError("Invalid index")
+        self._make_room(k, 1)
         self._A[k] = value                      # store newest element
-        self._n += 1
+
+    def insert_many(self, k, iterable):
+        """Insert the elements of iterable at index k with a single shift of the tail."""
+        if k < 0:
+            k += self._n
+        if not 0 <= k <= self._n:
+            raise IndexError("Invalid index")
+        items, count = self._block(iterable)
+        self._make_room(k, count)
+        self._write(k, items, count)
 
     def remove(self, value):
         """Remove first occurrence of value (or rise ValueError)."""
         # note: we do not consider shrinking the dynamic array in this version
-        for k in range(self._n):
-            if self._A[k] == value:             # found a match
-                for j in range(k, self._n-1):   # shift others to fill gp
-                    self._A[j] == self._A[j+1]
-                self._A[self._n - 1] = None     # help garbage collection
-                self._n -= 1                    # we all one less item
-                return                          # exit immediately
-        raise ValueError("Value not found")
+        try:
+            if self._dtype is None:
+                k = self._A.index(value, 0, self._n)
+            else:
+                k = self._A[:self._n].index(value)
+        except ValueError:
+            raise ValueError("Value not found") from None
+        self._close_gap(k, 1)
+
+    def reserve(self, n):
+        """Make room for n elements in total without further reallocation."""
+        if n > self._capacity:
+            self._resize(n)
+
+    def shrink_to_fit(self):
+        """Release all unused capacity."""
+        if self._capacity > max(self._n, 1):
+            self._resize(max(self._n, 1))
+
+    def _make_room(self, k, count):
+        """Grow n by count, moving elements from index k onward count places right.
+
+        A negative count instead closes the gap ending at k.
+        """
+        if count < 0:
+            self._close_gap(k + count, -count)
+            return
+        if self._n + count > self._capacity:     # not enough room
+            self._resize(self._growth.grow(self._capacity, self._n + count))
+        if self._dtype is None:
+            if count == 1:
+                self._A.insert(k, None)
+                self._A.pop()                   # give back one spare slot
+            elif count:
+                self._A[k:k] = [None] * count
+                del self._A[-count:]
+        else:
+            self._copy(self._A, k, self._A, k + count, self._n - k)
+        self._n += count
+
+    def _close_gap(self, k, count):
+        """Remove count elements starting at index k, moving the tail left."""
+        if self._dtype is None:
+            del self._A[k:k + count]
+            self._A.extend([None] * count)      # keep the capacity
+        else:
+            self._copy(self._A, k + count, self._A, k, self._n - k - count)
+        self._n -= count
+        capacity = self._growth.shrink(self._capacity, self._n)
+        if capacity is not None and capacity < self._capacity:
+            self._resize(capacity)
+
+    def _copy(self, source, src, target, dst, count):
+        """memmove count typed elements between ctypes arrays."""
+        if count <= 0:
+            return
+        size = ctypes.sizeof(self._ctype)
+        ctypes.memmove(ctypes.addressof(target) + dst * size,
+                       ctypes.addressof(source) + src * size, count * size)
+
+    def _block(self, iterable):
+        """Return (items, count) ready for _write.
+
+        A typed array takes a buffer of the same C type (another typed
+        DynamicArray, array.array, a NumPy array) as raw bytes, without
+        converting each element. Formats match by kind and size, so a NumPy
+        int64 array, which reports 'l' on LP64 platforms, fits a 'q' array.
+        """
+        if self._dtype is not None:
+            source = iterable.view() if isinstance(iterable, DynamicArray) and iterable.dtype else iterable
+            try:
+                buffer = memoryview(source)
+            except TypeError:
+                pass
+            else:
+                kind = _FORMAT_KINDS.get(buffer.format.lstrip("@=<"))
+                if (kind is not None and kind == _FORMAT_KINDS[self._dtype]
+                        and buffer.itemsize == ctypes.sizeof(self._ctype)
+                        and buffer.ndim == 1 and buffer.c_contiguous):
+                    if iterable is self:                # about to be shifted in place
+                        buffer = memoryview(buffer.tobytes()).cast(self._dtype)
+                    return buffer.cast("B"), buffer.nbytes // buffer.itemsize
+        items = list(iterable)
+        return items, len(items)
+
+    def _write(self, k, items, count):
+        """Store items from _block at indices k .. k + count - 1."""
+        if not count:
+            return
+        if isinstance(items, memoryview):
+            size = ctypes.sizeof(self._ctype)
+            memoryview(self._A).cast("B")[k * size:(k + count) * size] = items
+        else:
+            self._A[k:k + count] = items
 
     def _resize(self, c):                       # nonpublic utility
         """Resize internal array to capacity c."""
         B = self._make_array(c)                 # new(larger) array
-        for k in range(self._n):                # for each in A
-            B[k] = self._A[k]
+        if self._dtype is None:
+            B[:self._n] = self._A[:self._n]
+        else:
+            self._copy(self._A, 0, B, 0, self._n)
         self._A = B                             # use larger array
         self._capacity = c
 
-    @staticmethod
-    def _make_array(c):
+    def _make_array(self, c):
         """Return new array with capacity c."""
-        return (c * ctypes.py_object)()
+        if self._ctype is None:
+            return [None] * c
+        return (c * self._ctype)()
+
+
+class GapBuffer:
+    """A sequence with a gap of free slots kept where the last edit happened.
+
+    Inserting or removing at the gap is O(1); editing elsewhere first moves
+    the gap there, shifting only the elements in between as one block. It
+    offers DynamicArray's sequence API (indexing and slicing, including
+    slice assignment and deletion, insert, insert_many, extend, remove,
+    append), so cursor-local editing workloads can swap it in. append and
+    extend are cheap only while the gap sits at the end.
+    """
+
+    def __init__(self, iterable=(), growth=None):
+        self._growth = GeometricGrowth() if growth is None else growth
+        items = list(iterable)
+        self._capacity = max(1, self._growth.grow(len(items), len(items) + 1))
+        self._A = items + [None] * (self._capacity - len(items))
+        self._gap_start = len(items)            # first free slot
+        self._gap_end = self._capacity          # first element after the gap
+
+    def __repr__(self):
+        return "GapBuffer(%r)" % list(self)
+
+    def __len__(self):
+        return self._capacity - (self._gap_end - self._gap_start)
+
+    def __iter__(self):
+        yield from self._A[:self._gap_start]
+        yield from self._A[self._gap_end:]
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return GapBuffer(list(self)[k], self._growth)
+        return self._A[self._slot(k)]
+
+    def __setitem__(self, k, value):
+        """Set element k, or replace a slice: the gap moves to its start and widens over it."""
+        if isinstance(k, slice):
+            start, stop, step = k.indices(len(self))
+            if step != 1:
+                value = list(value)
+                positions = range(start, stop, step)
+                if len(value) != len(positions):
+                    raise ValueError("extended slice assignment needs a sequence of the same length")
+                for j, item in zip(positions, value):
+                    self._A[self._slot(j)] = item
+                return
+            self._delete_range(start, max(start, stop))
+            self._insert_block(start, list(value))
+            self._shrink()
+            return
+        self._A[self._slot(k)] = value
+
+    def __delitem__(self, k):
+        if isinstance(k, slice):
+            start, stop, step = k.indices(len(self))
+            if step == 1:
+                self._delete_range(start, max(start, stop))
+            else:                               # back to front, so the gap only moves left
+                for j in sorted(range(start, stop, step), reverse=True):
+                    self._delete_range(j, j + 1)
+        else:
+            k = self._index(k)
+            self._delete_range(k, k + 1)
+        self._shrink()
+
+    @property
+    def cursor(self):
+        """The index at which the gap currently sits."""
+        return self._gap_start
+
+    def append(self, obj):
+        self.insert(len(self), obj)
+
+    def extend(self, iterable):
+        """Append every element of iterable, moving the gap to the end once."""
+        self._insert_block(len(self), list(iterable))
+
+    def insert(self, k, value):
+        """Insert value at index k, moving the gap there first."""
+        self._insert_block(self._insert_index(k), [value])
+
+    def insert_many(self, k, iterable):
+        """Insert the elements of iterable at index k with a single move of the gap."""
+        self._insert_block(self._insert_index(k), list(iterable))
+
+    def remove(self, value):
+        """Remove first occurrence of value (or rise ValueError)."""
+        for k, item in enumerate(self):
+            if item == value:
+                del self[k]
+                return
+        raise ValueError("Value not found")
+
+    def _index(self, k):
+        n = len(self)
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError("Invalid index")
+        return k
+
+    def _insert_index(self, k):
+        """Return k as an index to insert at, 0..len(self), like DynamicArray.insert."""
+        n = len(self)
+        if k < 0:
+            k += n
+        if not 0 <= k <= n:
+            raise IndexError("Invalid index")
+        return k
+
+    def _slot(self, k):
+        """Return the slot in _A holding element k."""
+        k = self._index(k)
+        return k if k < self._gap_start else k + self._gap_end - self._gap_start
+
+    def _delete_range(self, start, stop):
+        """Remove elements start..stop-1 by moving the gap to start and widening it."""
+        count = stop - start
+        if count:
+            self._move_gap(start)
+            self._A[self._gap_end:self._gap_end + count] = [None] * count
+            self._gap_end += count
+
+    def _insert_block(self, k, items):
+        """Insert the list items at index k, growing first if the gap is too small."""
+        count = len(items)
+        if self._gap_end - self._gap_start < count:
+            self._resize(self._growth.grow(self._capacity, len(self) + count))
+        self._move_gap(k)
+        self._A[self._gap_start:self._gap_start + count] = items
+        self._gap_start += count
+
+    def _move_gap(self, k):
+        """Move the gap to start at index k, shifting the elements in between as a block."""
+        A, start, end = self._A, self._gap_start, self._gap_end
+        if k < start:                           # elements k..start move right
+            count = start - k
+            A[end - count:end] = A[k:start]
+            A[k:min(start, end - count)] = [None] * (min(start, end - count) - k)
+            self._gap_start, self._gap_end = k, end - count
+        elif k > start:                         # elements after the gap move left
+            count = k - start
+            A[start:k] = A[end:end + count]
+            vacated = max(end, k)
+            A[vacated:end + count] = [None] * (end + count - vacated)
+            self._gap_start, self._gap_end = k, end + count
+
+    def _shrink(self):
+        capacity = self._growth.shrink(self._capacity, len(self))
+        if capacity is not None and capacity < self._capacity:
+            self._resize(capacity)
+
+    def _resize(self, c):
+        """Rebuild the storage with capacity c, keeping the gap where it is."""
+        head, tail = self._A[:self._gap_start], self._A[self._gap_end:]
+        self._A = head + [None] * (c - len(head) - len(tail)) + tail
+        self._capacity = c
+        self._gap_end = c - len(tail)
+
+
+class MappedDynamicArray(DynamicArray):
+    """A typed DynamicArray whose storage is a memory-mapped file.
+
+    The file holds a small header (magic, typecode, length) followed by the
+    raw elements. Growing extends the file through the growth policy, just
+    as _resize does in memory, and remaps it; the length is written to the
+    header on every change, so the data survives restarts.
+
+    Opening with readonly=True maps the file copy-on-write: readers in any
+    number of processes share the writer's pages through the page cache
+    without copying them, and refresh() picks up elements appended since.
+
+    Memoryviews from view() pin the current mapping; release them before
+    an append that has to grow the file.
+    """
+
+    MAGIC = b"DYNARR01"
+    HEADER = struct.Struct("<8sc7xQ")   # magic, typecode, length
+    DATA_OFFSET = 32                    # keeps elements 16-byte aligned
+    DEFAULT_CAPACITY = 1024
+
+    def __init__(self, path, dtype=None, growth=None, capacity=DEFAULT_CAPACITY, readonly=False):
+        """Open the array stored at path, creating it with the given dtype if needed."""
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if not exists and readonly:
+            raise FileNotFoundError(path)
+        self._path = path
+        self._readonly = readonly
+        self._file = open(path, "rb" if readonly else ("r+b" if exists else "w+b"))
+        if exists:
+            header = self._file.read(self.HEADER.size)
+            magic, typecode, length = self.HEADER.unpack(header)
+            if magic != self.MAGIC:
+                self._file.close()
+                raise ValueError("%s is not a MappedDynamicArray file" % path)
+            if dtype is not None and dtype != typecode.decode():
+                self._file.close()
+                raise ValueError("%s holds dtype %r, not %r" % (path, typecode.decode(), dtype))
+            dtype = typecode.decode()
+        elif dtype is None:
+            raise ValueError("a dtype is needed to create a new array")
+        if dtype not in self.CTYPES:
+            raise ValueError("dtype must be one of %s" % "".join(self.CTYPES))
+        self._dtype = dtype
+        self._ctype = self.CTYPES[dtype]
+        self._growth = GeometricGrowth(2.0, None) if growth is None else growth
+        self._mmap = None
+        if exists:
+            self._length = length
+            self._attach()
+        else:
+            self._length = 0
+            self._file.truncate(self.DATA_OFFSET + max(capacity, 1) * self.itemsize)
+            self._attach()
+            self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def _n(self):
+        return self._length
+
+    @_n.setter
+    def _n(self, n):
+        self._length = n
+        self._write_header()
+
+    @property
+    def path(self):
+        return self._path
+
+    def append(self, obj):
+        self._check_writable()
+        DynamicArray.append(self, obj)
+
+    def extend(self, iterable):
+        self._check_writable()
+        DynamicArray.extend(self, iterable)
+
+    def insert(self, k, value):
+        self._check_writable()
+        DynamicArray.insert(self, k, value)
+
+    def insert_many(self, k, iterable):
+        self._check_writable()
+        DynamicArray.insert_many(self, k, iterable)
+
+    def remove(self, value):
+        self._check_writable()
+        DynamicArray.remove(self, value)
+
+    def __setitem__(self, k, value):
+        self._check_writable()
+        DynamicArray.__setitem__(self, k, value)
+
+    def __delitem__(self, k):
+        self._check_writable()
+        DynamicArray.__delitem__(self, k)
+
+    def refresh(self):
+        """Re-read the length from the file, remapping it if another process grew it."""
+        self._length = self.HEADER.unpack_from(self._mmap, 0)[2]
+        if self._length > self._capacity:
+            self._attach()
+
+    def flush(self):
+        if not self._readonly:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self.flush()
+            self._A = None
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _resize(self, c):
+        """Grow or shrink the file to hold c elements and map it again."""
+        self._check_writable()
+        self._file.truncate(self.DATA_OFFSET + c * self.itemsize)
+        self._attach()
+
+    def _attach(self):
+        """Map the whole file and view its data region as a ctypes array."""
+        self._A = None                  # drop the export so the old map can close
+        if self._mmap is not None:
+            self._mmap.close()
+        access = mmap.ACCESS_COPY if self._readonly else mmap.ACCESS_WRITE
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+        self._capacity = (len(self._mmap) - self.DATA_OFFSET) // self.itemsize
+        self._A = (self._capacity * self._ctype).from_buffer(self._mmap, self.DATA_OFFSET)
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self._dtype.encode(), self._length)
+
+    def _check_writable(self):
+        if self._readonly:
+            raise ValueError("array was opened read-only")
 
 
 def compute_average(n):
@@ -76,6 +698,30 @@ def compute_average(n):
     return (end - start) / n
 
 
+def compare_growth(n, policies=None):
+    """Append n items under each policy and report time, reallocations and slack.
+
+    Returns {policy: (seconds, reallocations, final capacity, unused slots)};
+    the reallocation count is replayed from the policy rather than measured.
+    """
+    if policies is None:
+        policies = [GeometricGrowth(2.0), GeometricGrowth(1.5), AdditiveGrowth(4096),
+                    OverallocatingGrowth()]
+    report = {}
+    for policy in policies:
+        data = DynamicArray(growth=policy)
+        start = perf_counter()
+        for k in range(n):
+            data.append(k)
+        elapsed = perf_counter() - start
+        capacity, reallocations = 1, 0
+        while capacity < n:
+            capacity = policy.grow(capacity, capacity + 1)
+            reallocations += 1
+        report[repr(policy)] = (elapsed, reallocations, data.capacity, data.capacity - n)
+    return report
+
+
 if __name__ == "__main__":
     print("Dynamic array")
     da = DynamicArray()
@@ -86,5 +732,21 @@ if __name__ == "__main__":
     print(list(da))
     da.remove(15)
     print(list(da))
+    da.insert_many(1, [6, 7, 8])
+    del da[3:5]
+    da[:1] = [1, 2, 3]
+    print(list(da), list(da[::2]))
+    samples = DynamicArray(dtype="d")
+    for k in range(5):
+        samples.append(k / 2)
+    print(list(samples), samples.view().tolist(), samples.view().nbytes)
+    text = GapBuffer("hello world")
+    for offset, ch in enumerate(", dear"):
+        text.insert(5 + offset, ch)             # the gap follows the cursor
+    del text[0]
+    text.insert(0, "H")
+    print("".join(text))
     # print(compute_average(10000))
+    # for policy, result in compare_growth(1000000).items():
+    #     print(policy, result)
 
@@ -0,0 +1,117 @@
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+from itertools import islice
+from time import perf_counter
+
+from structures.binary_heap import merge
+
+
+_BLOCK_HEADER = struct.Struct("<I")     # byte length of the pickled block that follows
+
+
+def _write_run(items, path, block_size):
+    """Write items to path as length-prefixed pickled blocks of block_size items."""
+    items = iter(items)
+    with open(path, "wb") as f:
+        while True:
+            block = list(islice(items, block_size))
+            if not block:
+                return
+            data = pickle.dumps(block, pickle.HIGHEST_PROTOCOL)
+            f.write(_BLOCK_HEADER.pack(len(data)))
+            f.write(data)
+
+
+def _read_run(path, buffer_size):
+    """Yield the items of a run file, reading it sequentially one block at a time."""
+    with open(path, "rb", buffering=buffer_size if buffer_size > 1 else 0) as f:
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if not header:
+                return
+            yield from pickle.loads(f.read(_BLOCK_HEADER.unpack(header)[0]))
+
+
+def external_sort(iterable, key=None, reverse=False, memory=64 << 20, fan_in=64,
+                  block_size=4096, buffer_size=1 << 20, tmpdir=None):
+    """Yield the items of iterable in sorted order using bounded memory.
+
+    Items are gathered until their estimated size reaches memory bytes, then
+    sorted and spilled to a temporary run file as pickled blocks. The runs are
+    merged fan_in at a time through BinaryHeap, each read sequentially through
+    a buffer_size buffer, with extra passes if there are more than fan_in runs.
+    Each reader of a merge gets memory // fan_in bytes, so buffer_size and
+    block_size are cut down until its buffer and one decoded block fit in
+    that share. Input that fits in memory is sorted without touching the
+    disk. The sort is stable, and key and reverse work as for sorted.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    share = memory // fan_in
+    buffer_size = min(buffer_size, share // 4)
+    with tempfile.TemporaryDirectory(prefix="external_sort-", dir=tmpdir) as directory:
+        runs = []
+        items, used = [], 0
+        for item in iterable:
+            items.append(item)
+            used += sys.getsizeof(item) + 8     # the item plus its list slot
+            if used >= memory:
+                if not runs:            # a block of average items takes half a reader's share
+                    block_size = max(1, min(block_size, share // 2 * len(items) // used))
+                items.sort(key=key, reverse=reverse)
+                runs.append(os.path.join(directory, "run-%d" % len(runs)))
+                _write_run(items, runs[-1], block_size)
+                items, used = [], 0
+        items.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from items
+            return
+        if items:
+            runs.append(os.path.join(directory, "run-%d" % len(runs)))
+            _write_run(items, runs[-1], block_size)
+        del items
+
+        passes = 0
+        while len(runs) > fan_in:       # merge consecutive groups so ties keep their order
+            passes += 1
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                merged.append(os.path.join(directory, "pass-%d-%d" % (passes, len(merged))))
+                readers = [_read_run(path, buffer_size) for path in group]
+                _write_run(merge(*readers, key=key, reverse=reverse), merged[-1], block_size)
+                for path in group:
+                    os.remove(path)
+            runs = merged
+
+        readers = [_read_run(path, buffer_size) for path in runs]
+        try:
+            yield from merge(*readers, key=key, reverse=reverse)
+        finally:
+            for reader in readers:
+                reader.close()
+
+
+def compare_sort(n=2000000, memory=16 << 20, fan_in=64):
+    """Time external_sort against sorted on n random floats."""
+    data = [random.random() for _ in range(n)]
+    start = perf_counter()
+    expected = sorted(data)
+    print("sorted          %.4f" % (perf_counter() - start))
+    start = perf_counter()
+    result = list(external_sort(iter(data), memory=memory, fan_in=fan_in))
+    print("external_sort   %.4f (memory=%d, fan_in=%d)" % (perf_counter() - start, memory, fan_in))
+    assert result == expected
+
+
+if __name__ == "__main__":
+    words = ["%05d" % random.randrange(100000) for _ in range(100000)]
+    ordered = list(external_sort(words, memory=256 << 10, fan_in=4))
+    print(ordered[:5], ordered == sorted(words))
+    print(list(external_sort(range(10), key=lambda x: x % 3, reverse=True, memory=100, fan_in=2)))
+
+    # compare_sort()
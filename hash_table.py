@@ -1,26 +1,116 @@
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+from array import array
+from operator import itemgetter
+from time import perf_counter, perf_counter_ns
+
+from structures.bloom_filter import BloomFilter, mix_hash
+
+try:
+    import numpy as np
+except ImportError:                 # put_many/get_many need numpy
+    np = None
+
+
+EMPTY = -1                          # index array marker for an unused slot
+DUMMY = -2                          # index array marker for a deleted slot
+_DELETED = object()                 # placeholder left in the entry columns
+_HASH_MODULUS = (1 << 61) - 1       # CPython reduces int hashes modulo this prime
+
+
 class HashTable:
     """
+    A compact open-addressing hash table for any hashable key. A small
+    integer index array maps slots to positions in dense, insertion-ordered
+    entry columns; each entry caches its mixed 64-bit hash so resizes never
+    rehash keys and __eq__ only runs on keys whose full hashes match.
+
     Attributes:
-        size
-        _slots
-        _data
+        capacity
+        load_factor
+        _indices
+        _hashes
+        _keys
+        _values
     Methods:
-        put(root, data)
-        get(root)
-        hash_function(root, _size)
-        rehash(old_hash, _size)
+        put(key, data)
+        get(key)
+        put_many(keys, values)
+        get_many(keys)
+        pop(key[, default])
+        reserve(n)
+        enable_stats(), disable_stats(), stats()
+        keys(), values(), items()
+        hash_function(key, size)
+        rehash(old_hash, size)
     """
-    def __init__(self, size):
-        self._size = size
-        self._slots = [None] * self._size
-        self._data = [None] * self._size
+    DEFAULT_CAPACITY = 8
+    MAX_LOAD = 0.75
+    MIN_LOAD = 0.2
+    PROBING = ("linear", "robin_hood", "cuckoo")
+    BUCKET_SIZE = 4                 # cuckoo slots per bucket
+    STASH_SIZE = 4                  # cuckoo overflow cells after the buckets
+    MAX_KICKS = 64                  # cuckoo evictions before using the stash
+
+    def __init__(self, size=DEFAULT_CAPACITY, max_load=MAX_LOAD, min_load=MIN_LOAD,
+                 probing="linear", bloom_error_rate=None, track_stats=False):
+        """
+        With linear probing, deleted slots are left as tombstones that are
+        reused by later inserts and purged on resize. With robin_hood
+        probing, inserts displace entries that sit closer to their home slot,
+        lookups stop as soon as they are further from home than the entry
+        they probe, and deletes shift the following cluster back. With cuckoo
+        probing, every key lives in one of two buckets of BUCKET_SIZE slots
+        or in a small stash, so a lookup checks at most
+        2 * BUCKET_SIZE + STASH_SIZE slots; inserts evict residents to their
+        alternate bucket and grow the table when that fails.
+
+        Passing bloom_error_rate keeps a Bloom filter of the stored hashes
+        with that false-positive rate, so most lookups of absent keys return
+        without touching the index array. It is rebuilt on every resize,
+        which also clears the bits of deleted keys.
+
+        track_stats=True starts with statistics enabled (see enable_stats).
+        """
+        if probing not in self.PROBING:
+            raise ValueError("probing must be one of %s" % (self.PROBING,))
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1")
+        if not 0 <= min_load < max_load / 2:
+            raise ValueError("min_load must be less than half of max_load")
+        self._max_load = max_load
+        self._min_load = min_load
+        self._probing = probing
+        self._robin_hood = probing == "robin_hood"
+        self._cuckoo = probing == "cuckoo"
+        self._size = self._next_power_of_two(max(size, self.DEFAULT_CAPACITY))
+        self._indices = self._make_indices(self._cells(self._size))
+        self._hashes = array("q")   # dense entries, in insertion order
+        self._keys = []
+        self._values = []
+        self._used = 0              # live entries; the rest are _DELETED
+        self._inexact_keys = 0      # live keys that are not ints hashing to themselves
+        self._bloom_error_rate = bloom_error_rate
+        self._bloom = None
+        if bloom_error_rate is not None:
+            self._rebuild_bloom()
+        self._stats = None
+        if track_stats:
+            self.enable_stats()
 
     def __len__(self):
-        return self._size
+        return self._used
+
+    def __iter__(self):
+        return self.keys()
 
     def __contains__(self, key):
-        key = self.hash_function(key, len(self._slots))
-        return self._slots[key] is not None
+        return self._find(key, self._full_hash(key)) != EMPTY
 
     def __setitem__(self, key, data):
         self.put(key, data)
@@ -28,57 +118,981 @@ class HashTable:
     def __getitem__(self, key):
         return self.get(key)
 
+    def __delitem__(self, key):
+        position = self._find(key, self._full_hash(key))
+        if position == EMPTY:
+            raise KeyError(key)
+        self._delete(position)
+
+    @property
+    def capacity(self):
+        return self._size
+
+    @property
+    def load_factor(self):
+        return self._used / self._size
+
     def put(self, key, data):
-        hash_value = self.hash_function(key, len(self._slots))
-        if self._slots[hash_value] is None:
-            self._slots[hash_value] = key
-            self._data[hash_value] = data
-        else:
-            if self._slots[hash_value] == key:
-                self._data[hash_value] == data       # replace
-            else:
-                next_slot = self.rehash(hash_value, len(self._slots))
-                while self._slots[next_slot] is not None and self._slots[next_slot] is not key:
-                    next_slot = self.rehash(next_slot, len(self._slots))
-                if self._slots[next_slot] is None:
-                    self._slots[next_slot] = key
-                    self._data[next_slot] = data
-                else:
-                    self._data[next_slot] = data     # replace
+        hash_value = self._full_hash(key)
+        position = self._find(key, hash_value)
+        if position != EMPTY:
+            self._values[self._indices[position]] = data     # replace
+            return
+        if len(self._keys) + 1 > self._max_load * self._size:
+            self._resize(self._capacity_for(self._used + 1))
+        self._hashes.append(hash_value)
+        self._keys.append(key)
+        self._values.append(data)
+        if not self._place(len(self._keys) - 1, hash_value):
+            self._resize(2 * self._size)
+        if self._bloom is not None:
+            self._bloom.add_hash(hash_value)
+        self._used += 1
+        if type(key) is not int or not -_HASH_MODULUS < key < _HASH_MODULUS or key == -1:
+            self._inexact_keys += 1
 
     def get(self, key):
-        start_slot = self.hash_function(key, len(self._slots))
-        data = None
-        stop = False
-        found = False
-        position = start_slot
-        while self._slots[position] is not None and not found and not stop:
-            if self._slots[position] == key:
-                found = True
-                data = self._data[position]
-            else:
-                position = self.rehash(position, len(self._slots))
-                if position == start_slot:
-                    stop = True
-        return data
+        position = self._find(key, self._full_hash(key))
+        if position == EMPTY:
+            return None
+        return self._values[self._indices[position]]
+
+    def pop(self, key, *default):
+        """Remove key and return its value, or default if key is absent."""
+        position = self._find(key, self._full_hash(key))
+        if position == EMPTY:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return self._delete(position)
+
+    def put_many(self, keys, values):
+        """Insert int64 keys with their values, hashing and probing in vectorized passes.
+
+        keys is a NumPy array or any buffer of integers; values is a sequence
+        of the same length. Duplicate keys behave as repeated puts: the last
+        value wins and the first occurrence fixes the insertion order.
+        """
+        keys = self._as_int64(keys)
+        if len(keys) != len(values):
+            raise ValueError("keys and values must have the same length")
+        if not len(keys):
+            return
+        unique, last = self._last_occurrences(keys)
+        if self._probing != "linear":
+            for key, data in zip(unique.tolist(), self._take(values, last)):
+                self.put(key, data)
+            return
+        if len(self._keys) + len(unique) > self._max_load * self._size:
+            self._resize(self._capacity_for(self._used + len(unique)))
+        hashes = self._hash_many(unique)
+        found = self._find_many(unique, hashes)
+        existing = found >= 0
+        for index, data in zip(found[existing].tolist(), self._take(values, last[existing])):
+            self._values[index] = data
+        missing = ~existing
+        if not missing.any():
+            return
+        base = len(self._keys)
+        self._hashes.frombytes(hashes[missing].tobytes())
+        self._keys.extend(unique[missing].tolist())
+        self._values.extend(self._take(values, last[missing]))
+        self._place_many(np.arange(base, len(self._keys)), hashes[missing])
+        if self._bloom is not None:
+            for hash_value in hashes[missing].tolist():
+                self._bloom.add_hash(hash_value)
+        self._used += len(self._keys) - base
+        self._inexact_keys += int(np.count_nonzero(~self._exact(unique[missing])))
+
+    def get_many(self, keys, default=None, dtype=object):
+        """Look up int64 keys in vectorized passes.
+
+        Return a NumPy array of the values (default where a key is absent)
+        and a boolean mask of the keys that were found.
+        """
+        keys = self._as_int64(keys)
+        found = self._find_many(keys, self._hash_many(keys))
+        mask = found >= 0
+        result = np.full(len(keys), default, dtype=dtype)
+        if mask.any():
+            values = self._take(self._values, found[mask])
+            # a 1-D object array first, so tuple or array values stay whole
+            result[mask] = np.fromiter(values, dtype=object, count=len(values))
+        return result, mask
+
+    def reserve(self, n):
+        """Pre-size the table so that n keys fit without further resizing."""
+        capacity = self._next_power_of_two(int(n / self._max_load) + 1)
+        if capacity > self._size:
+            self._resize(capacity)
+
+    def keys(self):
+        return (key for key in self._keys if key is not _DELETED)
+
+    def values(self):
+        return (data for key, data in zip(self._keys, self._values) if key is not _DELETED)
+
+    def items(self):
+        return ((key, data) for key, data in zip(self._keys, self._values) if key is not _DELETED)
+
+    def enable_stats(self):
+        """Start recording probe lengths and resizes, resetting earlier counts.
+
+        The counting versions of put, _find and _resize are bound on the
+        instance, so a table with statistics disabled runs the plain class
+        methods and pays nothing. Bulk put_many/get_many are not counted.
+        """
+        self._stats = {"put": {}, "lookup": {}, "resizes": 0, "resize_seconds": 0.0}
+        self._stats_operation = "lookup"
+        self.put = self._put_counted
+        self._find = self._find_counted
+        self._resize = self._resize_counted
+
+    def disable_stats(self):
+        if self._stats is not None:
+            del self.put, self._find, self._resize
+            self._stats = None
+
+    def stats(self):
+        """Return probe-length histograms and table shape, or None if disabled.
+
+        The histograms map the number of slots inspected to how many put or
+        lookup (get, in, pop, del) calls inspected that many; 0 means the
+        Bloom filter answered.
+        """
+        if self._stats is None:
+            return None
+        return {
+            "size": self._used,
+            "capacity": self._size,
+            "load_factor": self.load_factor,
+            "max_cluster": self._max_cluster(),
+            "resizes": self._stats["resizes"],
+            "resize_seconds": self._stats["resize_seconds"],
+            "put_probes": dict(sorted(self._stats["put"].items())),
+            "lookup_probes": dict(sorted(self._stats["lookup"].items())),
+        }
 
     def get_slots(self):
-        return self._slots
+        return [None if index < 0 else self._keys[index] for index in self._indices]
 
     def get_data(self):
-        return self._data
+        return [None if index < 0 else self._values[index] for index in self._indices]
+
+    def _put_counted(self, key, data):
+        self._stats_operation = "put"
+        try:
+            HashTable.put(self, key, data)
+        finally:
+            self._stats_operation = "lookup"
+
+    def _find_counted(self, key, hash_value):
+        position = HashTable._find(self, key, hash_value)
+        histogram = self._stats[self._stats_operation]
+        probes = self._probe_count(key, hash_value, position)
+        histogram[probes] = histogram.get(probes, 0) + 1
+        return position
+
+    def _resize_counted(self, capacity):
+        start = perf_counter()
+        HashTable._resize(self, capacity)
+        self._stats["resizes"] += 1
+        self._stats["resize_seconds"] += perf_counter() - start
+
+    def _probe_count(self, key, hash_value, position):
+        """Return how many slots the lookup that ended at position inspected."""
+        if self._bloom is not None and not self._bloom.contains_hash(hash_value):
+            return 0
+        if self._cuckoo:
+            if position == EMPTY:
+                return 2 * self.BUCKET_SIZE + self.STASH_SIZE
+            first, second = self._buckets(hash_value)
+            for probes, start in enumerate((first, second, self._size)):
+                if start <= position < start + self.BUCKET_SIZE:
+                    return probes * self.BUCKET_SIZE + position - start + 1
+        if position != EMPTY:
+            return self._distance_from(hash_value, position) + 1
+        probes = 1
+        position = self.hash_function(hash_value, self._size)
+        index = self._indices[position]
+        while index != EMPTY:
+            if self._robin_hood and probes - 1 > self._distance(index, position):
+                break
+            position = self.rehash(position, self._size)
+            index = self._indices[position]
+            probes += 1
+        return probes
+
+    def _max_cluster(self):
+        """Return the longest run of occupied slots, or None for cuckoo tables."""
+        if self._cuckoo:
+            return None
+        longest = run = 0
+        for index in self._indices + self._indices:     # twice, for runs that wrap
+            run = run + 1 if index != EMPTY else 0
+            longest = max(longest, run)
+        return min(longest, self._size)
+
+    def _find(self, key, hash_value):
+        """Return the slot holding key, or EMPTY."""
+        if self._bloom is not None and not self._bloom.contains_hash(hash_value):
+            return EMPTY
+        if self._cuckoo:
+            return self._find_cuckoo(key, hash_value)
+        size = self._size
+        position = self.hash_function(hash_value, size)
+        distance = 0
+        index = self._indices[position]
+        while index != EMPTY:
+            if index != DUMMY and self._hashes[index] == hash_value:
+                candidate = self._keys[index]
+                if candidate is key or candidate == key:
+                    return position
+            if self._robin_hood and distance > self._distance(index, position):
+                break               # key would have displaced this entry
+            position = self.rehash(position, size)
+            distance += 1
+            index = self._indices[position]
+        return EMPTY
+
+    def _place(self, index, hash_value):
+        """Point a free slot for hash_value at entry index; False if none was found."""
+        if self._cuckoo:
+            return self._place_cuckoo(index, hash_value)
+        size = self._size
+        position = self.hash_function(hash_value, size)
+        if not self._robin_hood:
+            while self._indices[position] >= 0:          # reuse tombstones
+                position = self.rehash(position, size)
+            self._indices[position] = index
+            return True
+        distance = 0
+        while self._indices[position] != EMPTY:
+            resident = self._indices[position]
+            resident_distance = self._distance(resident, position)
+            if resident_distance < distance:            # rob the richer entry
+                self._indices[position] = index
+                index, distance = resident, resident_distance
+            position = self.rehash(position, size)
+            distance += 1
+        self._indices[position] = index
+        return True
+
+    def _find_cuckoo(self, key, hash_value):
+        for start in self._buckets(hash_value) + (self._size,):
+            for position in range(start, start + self.BUCKET_SIZE):
+                index = self._indices[position]
+                if index >= 0 and self._hashes[index] == hash_value:
+                    candidate = self._keys[index]
+                    if candidate is key or candidate == key:
+                        return position
+        return EMPTY
+
+    def _place_cuckoo(self, index, hash_value):
+        """Insert entry index, evicting residents to their other bucket as needed."""
+        for _ in range(self.MAX_KICKS):
+            buckets = self._buckets(hash_value)
+            for start in buckets:
+                for position in range(start, start + self.BUCKET_SIZE):
+                    if self._indices[position] == EMPTY:
+                        self._indices[position] = index
+                        return True
+            position = random.choice(buckets) + random.randrange(self.BUCKET_SIZE)
+            self._indices[position], index = index, self._indices[position]
+            hash_value = self._hashes[index]
+        for position in range(self._size, self._size + self.STASH_SIZE):
+            if self._indices[position] == EMPTY:
+                self._indices[position] = index
+                return True
+        return False                # the evicted entry is re-placed by _resize
+
+    def _buckets(self, hash_value):
+        """Return the first slots of the two cuckoo buckets for hash_value."""
+        mask = self._size // self.BUCKET_SIZE - 1
+        first = hash_value & mask
+        second = ((hash_value >> 32) * 0x9e3779b1 >> 7) & mask
+        return first * self.BUCKET_SIZE, second * self.BUCKET_SIZE
+
+    def _delete(self, position):
+        """Remove the entry referenced by slot position and return its value."""
+        index = self._indices[position]
+        key = self._keys[index]
+        data = self._values[index]
+        if type(key) is not int or not -_HASH_MODULUS < key < _HASH_MODULUS or key == -1:
+            self._inexact_keys -= 1
+        self._hashes[index] = 0
+        self._keys[index] = _DELETED
+        self._values[index] = None
+        self._used -= 1
+        if self._robin_hood:
+            self._shift_back(position)
+        elif self._cuckoo:
+            self._indices[position] = EMPTY
+        else:
+            self._indices[position] = DUMMY
+        if self._used < self._min_load * self._size and self._size > self.DEFAULT_CAPACITY:
+            # Size for one more key, as put would, so that insert/delete churn
+            # at a steady size never shrinks a table the next put regrows.
+            capacity = self._capacity_for(self._used + 1)
+            if capacity < self._size:
+                self._resize(capacity)
+        return data
+
+    def _shift_back(self, position):
+        """Empty slot position, moving the displaced entries after it back by one."""
+        size = self._size
+        following = self.rehash(position, size)
+        index = self._indices[following]
+        while index != EMPTY and self._distance(index, following) > 0:
+            self._indices[position] = index
+            position = following
+            following = self.rehash(following, size)
+            index = self._indices[following]
+        self._indices[position] = EMPTY
+
+    def _find_many(self, keys, hashes):
+        """Return the entry index of each key, or EMPTY, probing all keys in lockstep."""
+        found = np.full(len(keys), EMPTY, dtype=np.int64)
+        if self._probing != "linear":
+            for i, (key, hash_value) in enumerate(zip(keys.tolist(), hashes.tolist())):
+                position = self._find(key, hash_value)
+                if position != EMPTY:
+                    found[i] = self._indices[position]
+            return found
+        indices = np.frombuffer(self._indices, dtype=self._indices.typecode)
+        stored = np.frombuffer(self._hashes, dtype=np.int64)
+        mask = self._size - 1
+        pending = np.arange(len(keys))
+        positions = hashes & mask
+        # When every stored key and a probed key are ints that hash to
+        # themselves, equal cached hashes already mean equal keys.
+        trusted = self._exact(keys) if not self._inexact_keys else np.zeros(len(keys), dtype=bool)
+        while len(pending):
+            index = indices[positions].astype(np.int64)
+            live = index >= 0
+            candidates = np.flatnonzero(live)
+            hit = stored[index[candidates]] == hashes[pending[candidates]]
+            candidates = candidates[hit]
+            check = candidates[~trusted[pending[candidates]]]
+            if len(check):
+                stored_keys = self._take(self._keys, index[check])
+                equal = [a == b for a, b in zip(stored_keys, keys[pending[check]].tolist())]
+                live[check] = equal
+                candidates = candidates[live[candidates]]
+            found[pending[candidates]] = index[candidates]
+            done = index == EMPTY
+            done[candidates] = True
+            pending, positions = pending[~done], (positions[~done] + 1) & mask
+        return found
+
+    def _place_many(self, entries, hashes):
+        """Point a free slot at each of entries; keys colliding on a slot take turns."""
+        indices = np.frombuffer(self._indices, dtype=self._indices.typecode)
+        mask = self._size - 1
+        positions = hashes & mask
+        while len(entries):
+            free = np.flatnonzero(indices[positions] < 0)   # reuse tombstones
+            indices[positions[free]] = entries[free]        # one claimant per slot sticks
+            placed = np.zeros(len(entries), dtype=bool)
+            placed[free] = indices[positions[free]] == entries[free]
+            entries, positions = entries[~placed], (positions[~placed] + 1) & mask
+
+    def _distance(self, index, position):
+        """Return how far slot position is from the home slot of entry index."""
+        return self._distance_from(self._hashes[index], position)
+
+    def _distance_from(self, hash_value, position):
+        return (position - self.hash_function(hash_value, self._size)) & (self._size - 1)
+
+    def _capacity_for(self, n):
+        """Return a capacity holding n keys at no more than half the maximum load.
+
+        Rounding up to a power of two can leave n below min_load, where the
+        next delete would shrink straight back; the half-size table is used
+        instead whenever n still fits it under the maximum load.
+        """
+        capacity = self._next_power_of_two(max(int(2 * n / self._max_load) + 1, self.DEFAULT_CAPACITY))
+        if (n < self._min_load * capacity and 2 * n < self._max_load * capacity
+                and capacity > self.DEFAULT_CAPACITY):
+            capacity //= 2
+        return capacity
+
+    def _resize(self, capacity):
+        """Compact the entries and rebuild the index array at the given capacity."""
+        if self._used < len(self._keys):
+            live = [index for index, key in enumerate(self._keys) if key is not _DELETED]
+            self._hashes = array("q", [self._hashes[index] for index in live])
+            self._keys = [self._keys[index] for index in live]
+            self._values = [self._values[index] for index in live]
+        while True:
+            self._size = capacity
+            self._indices = self._make_indices(self._cells(capacity))
+            if all(self._place(index, hash_value)
+                   for index, hash_value in enumerate(self._hashes)):
+                break
+            capacity *= 2           # only cuckoo placement can fail
+        if self._bloom is not None:
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        """Size a fresh Bloom filter for a full table and add the live hashes."""
+        self._bloom = BloomFilter(int(self._max_load * self._size) + 1, self._bloom_error_rate)
+        for hash_value in self._hashes:
+            self._bloom.add_hash(hash_value)
+
+    def _cells(self, capacity):
+        """Return the length of the index array for a table of the given capacity."""
+        return capacity + self.STASH_SIZE if self._cuckoo else capacity
+
+    @staticmethod
+    def _make_indices(capacity):
+        """Return an index array using the narrowest integer type for capacity."""
+        if capacity < 1 << 7:
+            typecode = "b"
+        elif capacity < 1 << 15:
+            typecode = "h"
+        elif capacity < 1 << 31:
+            typecode = "i" if array("i").itemsize == 4 else "l"
+        else:
+            typecode = "q"
+        return array(typecode, [EMPTY]) * capacity
+
+    @staticmethod
+    def _as_int64(keys):
+        if np is None:
+            raise ImportError("put_many and get_many require numpy")
+        keys = np.asarray(keys).ravel()
+        if not len(keys):
+            return keys.astype(np.int64)
+        if keys.dtype.kind not in "iu":
+            raise TypeError("keys must be integers, not %s" % keys.dtype)
+        if keys.dtype == np.uint64 and keys.max() > np.iinfo(np.int64).max:
+            raise OverflowError("keys must fit in int64")
+        return keys.astype(np.int64, copy=False)
+
+    @staticmethod
+    def _exact(keys):
+        """Return a mask of the int64 keys whose hash() is the key itself."""
+        return (np.abs(keys).view(np.uint64) < np.uint64(_HASH_MODULUS)) & (keys != -1)
+
+    @staticmethod
+    def _last_occurrences(keys):
+        """Return the distinct keys in first-seen order and where each last occurs."""
+        order = np.argsort(keys, kind="stable")
+        ordered = keys[order]
+        starts = np.empty(len(keys), dtype=bool)
+        starts[0] = True
+        np.not_equal(ordered[1:], ordered[:-1], out=starts[1:])
+        if starts.all():
+            return keys, np.arange(len(keys))
+        group_starts = np.flatnonzero(starts)
+        first = order[group_starts]
+        last = order[np.append(group_starts[1:], len(keys)) - 1]
+        by_first = np.argsort(first)
+        return keys[first[by_first]], last[by_first]
+
+    @staticmethod
+    def _take(sequence, positions):
+        """Return a list of sequence[i] for each i in the integer array positions."""
+        if isinstance(sequence, np.ndarray):
+            return sequence[positions].tolist()
+        positions = positions.tolist()
+        if not positions:
+            return []
+        if len(positions) == 1:
+            return [sequence[positions[0]]]
+        return list(itemgetter(*positions)(sequence))
+
+    @staticmethod
+    def _hash_many(keys):
+        """Vectorized _full_hash for an int64 array; matches _full_hash bit for bit."""
+        with np.errstate(over="ignore"):
+            magnitude = np.abs(keys).view(np.uint64) % np.uint64(_HASH_MODULUS)
+            h = np.where(keys < 0, -magnitude.view(np.int64), magnitude.view(np.int64))
+            h[h == -1] = -2             # hash(-1) == -2 in CPython
+            h = h.view(np.uint64)
+            h ^= h >> np.uint64(33)
+            h *= np.uint64(0xff51afd7ed558ccd)
+            h ^= h >> np.uint64(33)
+            h *= np.uint64(0xc4ceb9fe1a85ec53)
+            h ^= h >> np.uint64(33)
+        return h.view(np.int64)
+
+    @staticmethod
+    def _next_power_of_two(n):
+        """Return the smallest power of two greater than or equal to n."""
+        return 1 << (n - 1).bit_length()
+
+    @staticmethod
+    def _full_hash(key):
+        """Return the mixed 64-bit hash cached with each entry (see mix_hash)."""
+        return mix_hash(hash(key))
 
     @staticmethod
     def hash_function(key, size):
-        return key % size
+        return key & (size - 1)
 
     @staticmethod
     def rehash(old_hash, size):
-        return (old_hash+1) % size
+        return (old_hash + 1) & (size - 1)
+
+
+class ShardedHashTable:
+    """
+    A thread-safe table that spreads keys over independent HashTable shards,
+    each guarded by its own lock, so writers to different shards never wait
+    on each other.
+
+    Reads take no lock when the interpreter has a GIL. Every write bumps its
+    shard's version to an odd number before mutating and back to even after;
+    a reader that sees an odd or changed version, or trips over a
+    half-finished resize, retries under the lock. Free-threaded builds
+    always read under the lock.
+
+    Methods:
+        put(key, data)
+        get(key)
+        pop(key[, default])
+        setdefault(key[, default])
+        update_if(key, data, condition)
+    """
+    DEFAULT_SHARDS = 16
+
+    def __init__(self, shards=DEFAULT_SHARDS, **options):
+        """Create shards HashTables, passing options to each."""
+        if shards < 1:
+            raise ValueError("shards must be positive")
+        self._shards = [HashTable(**options) for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._versions = [0] * shards
+        gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+        self._lock_free_reads = gil_enabled()
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, key):
+        return self._read(key, HashTable.__contains__)
+
+    def __setitem__(self, key, data):
+        self.put(key, data)
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    # Operations go through the shard instance, whose put may be the
+    # stats-counting one bound by enable_stats.
+    def put(self, key, data):
+        self._write(key, lambda shard, key: shard.put(key, data))
+
+    def get(self, key):
+        return self._read(key, lambda shard, key: shard.get(key))
+
+    def pop(self, key, *default):
+        return self._write(key, lambda shard, key: shard.pop(key, *default))
+
+    def setdefault(self, key, default=None):
+        """Return the value for key, first storing default if key is absent."""
+        def setdefault(shard, key):
+            if key in shard:
+                return shard.get(key)
+            shard.put(key, default)
+            return default
+        return self._write(key, setdefault)
+
+    def update_if(self, key, data, condition):
+        """Store data under key if condition(current value or None) is true.
+
+        Return True if the value was replaced.
+        """
+        def update_if(shard, key):
+            if not condition(shard.get(key)):
+                return False
+            shard.put(key, data)
+            return True
+        return self._write(key, update_if)
+
+    def keys(self):
+        """Return a list of the keys, taken one consistent shard at a time."""
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        return [data for _, data in self.items()]
+
+    def items(self):
+        items = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def _shard_for(self, key):
+        return (HashTable._full_hash(key) >> 40) % len(self._shards)
+
+    def _read(self, key, operation):
+        number = self._shard_for(key)
+        if self._lock_free_reads:
+            version = self._versions[number]
+            if not version & 1:
+                try:
+                    result = operation(self._shards[number], key)
+                except Exception:
+                    pass            # raced a writer; the locked retry decides
+                else:
+                    if self._versions[number] == version:
+                        return result
+        with self._locks[number]:
+            return operation(self._shards[number], key)
+
+    def _write(self, key, operation):
+        number = self._shard_for(key)
+        with self._locks[number]:
+            self._versions[number] += 1
+            try:
+                return operation(self._shards[number], key)
+            finally:
+                self._versions[number] += 1
+
+
+class MappedHashTable:
+    """
+    A persistent hash table of str/bytes keys and values kept in a
+    memory-mapped file, so opening an existing table costs a header read and
+    read-only openers in other processes share its pages through the page
+    cache.
+
+    File layout: a header, then space handed out by a bump allocator from
+    the end of the used region. Slots are fixed-width records
+    (hash, key offset, value offset, key length, value length) in one
+    allocated table; keys and values go to the same region as tagged blobs,
+    so variable-length data never moves. The file grows geometrically in
+    place; when the table itself grows a larger one is allocated and the
+    records are copied over, leaving the old table behind as garbage. A
+    table filled mostly by tombstones is rebuilt in place instead. A new
+    value overwrites the old one in place when it is no longer; otherwise,
+    and for popped keys, the old blobs become garbage too, which compact()
+    reclaims by rewriting the live records into a fresh file.
+
+    Hashes are blake2b digests of the key blob, so they are stable across
+    processes, unlike hash() on str and bytes.
+
+    Methods:
+        put(key, data)
+        get(key)
+        pop(key[, default])
+        compact()
+        flush()
+        close()
+    """
+    MAGIC = b"HTMAP001"
+    HEADER = struct.Struct("<8sQQQQ")   # magic, capacity, used, filled, table offset
+    END = struct.Struct("<Q")           # end of the allocated region, after HEADER
+    RECORD = struct.Struct("<qQQII")    # hash, key offset, value offset, key len, value len
+    DELETED = 1                         # key offset of a tombstone; 0 marks an empty slot
+    DEFAULT_CAPACITY = 1024
+    MAX_LOAD = 0.75
+    _TAGS = {bytes: b"b", str: b"s"}
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, readonly=False):
+        """Open the table stored at path, creating it with capacity slots if needed."""
+        self._path = path
+        self._readonly = readonly
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if not exists and readonly:
+            raise FileNotFoundError(path)
+        self._file = open(path, "rb" if readonly else ("r+b" if exists else "w+b"))
+        if not exists:
+            self._file.truncate(self.HEADER.size + self.END.size)
+        self._map()
+        if exists:
+            magic, self._capacity, self._used, self._filled, self._table = \
+                self.HEADER.unpack_from(self._mmap, 0)
+            if magic != self.MAGIC:
+                self.close()
+                raise ValueError("%s is not a MappedHashTable file" % path)
+        else:
+            self._set_end(self.HEADER.size + self.END.size)
+            self._capacity = HashTable._next_power_of_two(max(capacity, 8))
+            self._used = self._filled = 0
+            self._table = self._allocate(self._capacity * self.RECORD.size)
+            self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._used
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def __contains__(self, key):
+        return self._find(self._encode(key))[1] is not None
+
+    def __setitem__(self, key, data):
+        self.put(key, data)
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def put(self, key, data):
+        self._check_writable()
+        blob = self._encode(key)
+        value = self._encode(data)
+        hash_value, position = self._find(blob)
+        if position is None:
+            value_offset, value_length = self._store(value)
+            if self._filled + 1 > self.MAX_LOAD * self._capacity:
+                # Mostly tombstones: clear them in place rather than doubling.
+                if self._used + 1 > self.MAX_LOAD / 2 * self._capacity:
+                    self._grow(2 * self._capacity)
+                else:
+                    self._rebuild()
+            key_offset, key_length = self._store(blob)
+            position = self._free_slot(hash_value)
+            if self._record(position)[1] == 0:
+                self._filled += 1   # tombstones were already counted
+            self._used += 1
+        else:
+            _, key_offset, value_offset, key_length, value_length = self._record(position)
+            if len(value) <= value_length:
+                self._mmap[value_offset:value_offset + len(value)] = value
+                value_length = len(value)
+            else:
+                value_offset, value_length = self._store(value)
+        self.RECORD.pack_into(self._mmap, self._slot_offset(position),
+                              hash_value, key_offset, value_offset, key_length, value_length)
+        self._write_header()
+
+    def get(self, key):
+        position = self._find(self._encode(key))[1]
+        if position is None:
+            return None
+        _, _, value_offset, _, value_length = self._record(position)
+        return self._decode(value_offset, value_length)
+
+    def pop(self, key, *default):
+        self._check_writable()
+        position = self._find(self._encode(key))[1]
+        if position is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        _, _, value_offset, _, value_length = self._record(position)
+        data = self._decode(value_offset, value_length)
+        self.RECORD.pack_into(self._mmap, self._slot_offset(position), 0, self.DELETED, 0, 0, 0)
+        self._used -= 1
+        self._write_header()
+        return data
+
+    def items(self):
+        for position in range(self._capacity):
+            _, key_offset, value_offset, key_length, value_length = self._record(position)
+            if key_offset > self.DELETED:
+                yield (self._decode(key_offset, key_length),
+                       self._decode(value_offset, value_length))
+
+    def compact(self):
+        """Rewrite the live records into a fresh file, dropping every garbage byte."""
+        self._check_writable()
+        compact_path = self._path + ".compact"
+        if os.path.exists(compact_path):     # left by an interrupted compact()
+            os.remove(compact_path)
+        capacity = HashTable._next_power_of_two(max(8, int(self._used / self.MAX_LOAD) + 1))
+        with MappedHashTable(compact_path, capacity) as fresh:
+            for position in range(self._capacity):
+                hash_value, key_offset, value_offset, key_length, value_length = self._record(position)
+                if key_offset > self.DELETED:
+                    key_offset = fresh._store(self._mmap[key_offset:key_offset + key_length])[0]
+                    value_offset = fresh._store(self._mmap[value_offset:value_offset + value_length])[0]
+                    self.RECORD.pack_into(fresh._mmap, fresh._slot_offset(fresh._free_slot(hash_value)),
+                                          hash_value, key_offset, value_offset, key_length, value_length)
+            fresh._used = fresh._filled = self._used
+            fresh._write_header()
+        self.close()
+        os.replace(compact_path, self._path)
+        self._file = open(self._path, "r+b")
+        self._map()
+        _, self._capacity, self._used, self._filled, self._table = self.HEADER.unpack_from(self._mmap, 0)
+
+    def flush(self):
+        if not self._readonly:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self.flush()
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _find(self, blob):
+        """Return (hash, slot holding blob or None)."""
+        hash_value = self._hash(blob)
+        mask = self._capacity - 1
+        position = hash_value & mask
+        while True:
+            stored_hash, key_offset, _, key_length, _ = self._record(position)
+            if key_offset == 0:
+                return hash_value, None
+            if (stored_hash == hash_value and key_offset != self.DELETED and key_length == len(blob)
+                    and self._mmap[key_offset:key_offset + key_length] == blob):
+                return hash_value, position
+            position = (position + 1) & mask
+
+    def _free_slot(self, hash_value):
+        mask = self._capacity - 1
+        position = hash_value & mask
+        while self._record(position)[1] > self.DELETED:
+            position = (position + 1) & mask
+        return position
+
+    def _grow(self, capacity):
+        """Copy the live records into a freshly allocated table of the given capacity."""
+        old_table, old_capacity = self._table, self._capacity
+        self._table = self._allocate(capacity * self.RECORD.size)
+        self._capacity = capacity
+        for position in range(old_capacity):
+            record = self.RECORD.unpack_from(self._mmap, old_table + position * self.RECORD.size)
+            if record[1] > self.DELETED:
+                self.RECORD.pack_into(self._mmap, self._slot_offset(self._free_slot(record[0])),
+                                      *record)
+        self._filled = self._used
+
+    def _rebuild(self):
+        """Drop the tombstones by reinserting the live records into the same table."""
+        size = self._capacity * self.RECORD.size
+        records = [record for record in self.RECORD.iter_unpack(self._mmap[self._table:self._table + size])
+                   if record[1] > self.DELETED]
+        self._mmap[self._table:self._table + size] = bytes(size)
+        for record in records:
+            self.RECORD.pack_into(self._mmap, self._slot_offset(self._free_slot(record[0])), *record)
+        self._filled = self._used
+
+    def _store(self, blob):
+        offset = self._allocate(len(blob))
+        self._mmap[offset:offset + len(blob)] = blob
+        return offset, len(blob)
+
+    def _allocate(self, size):
+        """Reserve size bytes at the end of the used region, growing the file if needed."""
+        offset = self.END.unpack_from(self._mmap, self.HEADER.size)[0]
+        end = offset + size
+        if end > len(self._mmap):
+            size = max(end, 2 * len(self._mmap))
+            self._mmap.close()
+            self._file.truncate(size)
+            self._map()
+        self._set_end(end)
+        return offset
+
+    def _map(self):
+        access = mmap.ACCESS_READ if self._readonly else mmap.ACCESS_WRITE
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+
+    def _set_end(self, end):
+        self.END.pack_into(self._mmap, self.HEADER.size, end)
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self._capacity, self._used,
+                              self._filled, self._table)
+
+    def _record(self, position):
+        return self.RECORD.unpack_from(self._mmap, self._slot_offset(position))
+
+    def _slot_offset(self, position):
+        return self._table + position * self.RECORD.size
+
+    def _check_writable(self):
+        if self._readonly:
+            raise ValueError("table was opened read-only")
+
+    def _encode(self, obj):
+        tag = self._TAGS.get(type(obj))
+        if tag is None:
+            raise TypeError("keys and values must be str or bytes, not %s" % type(obj).__name__)
+        return tag + (obj.encode() if tag == b"s" else obj)
+
+    def _decode(self, offset, length):
+        blob = self._mmap[offset:offset + length]
+        return blob[1:].decode() if blob[:1] == b"s" else blob[1:]
+
+    @staticmethod
+    def _hash(blob):
+        return int.from_bytes(hashlib.blake2b(blob, digest_size=8).digest(), "little", signed=True)
+
+
+def compare_bulk(n):
+    """Return the seconds taken by per-key and bulk puts and gets of n int keys."""
+    keys = np.random.default_rng(0).integers(-2 ** 60, 2 ** 60, size=n)
+    values = np.arange(n)
+    table = HashTable()
+    start = perf_counter()
+    for key, data in zip(keys.tolist(), values.tolist()):
+        table.put(key, data)
+    put_loop = perf_counter() - start
+    start = perf_counter()
+    for key in keys.tolist():
+        table.get(key)
+    get_loop = perf_counter() - start
+    table = HashTable()
+    start = perf_counter()
+    table.put_many(keys, values)
+    put_bulk = perf_counter() - start
+    start = perf_counter()
+    table.get_many(keys, default=-1, dtype=np.int64)
+    get_bulk = perf_counter() - start
+    return {"put": (put_loop, put_bulk), "get": (get_loop, get_bulk)}
+
+
+def churn_resizes(n, cycles=1000, probing="linear"):
+    """Return how many resizes cycles of insert/delete pairs cost at a steady n keys."""
+    table = HashTable(probing=probing, track_stats=True)
+    for i in range(n):
+        table[i] = i
+    table.enable_stats()
+    for i in range(n, n + cycles):
+        table[i] = i
+        del table[i - n]
+    return table.stats()["resizes"]
+
+
+def lookup_latency(probing, n, max_load=HashTable.MAX_LOAD):
+    """Return lookup latency percentiles in ns over n hits and n misses."""
+    table = HashTable(max_load=max_load, probing=probing)
+    keys = ["key-%d" % i for i in range(n)]
+    for key in keys:
+        table.put(key, None)
+    probes = keys + ["miss-%d" % i for i in range(n)]
+    random.shuffle(probes)
+    timings = []
+    for key in probes:
+        start = perf_counter_ns()
+        table.get(key)
+        timings.append(perf_counter_ns() - start)
+    timings.sort()
+    return {percentile: timings[min(len(timings) - 1, int(len(timings) * percentile / 100))]
+            for percentile in (50, 90, 99, 99.9, 100)}
 
 
 if __name__ == "__main__":
-    table = HashTable(11)
+    table = HashTable()
     table[54] = "cat"
     table[26] = "dog"
     table[93] = "lion"
@@ -91,4 +1105,32 @@ if __name__ == "__main__":
     table[10] = "duck"
     print(table.get_slots())
     print(table.get_data())
+    print(list(table.items()))
     print(19 in table)
+    words = HashTable()
+    for word in "the quick brown fox jumps over the lazy dog".split():
+        words[word] = words.pop(word, 0) + 1
+    words[("fox", "dog")] = b"pair"
+    print(list(words.items()), "fox" in words)
+    if np is not None:
+        numbers = HashTable()
+        numbers.put_many(np.arange(0, 50, 5), np.arange(10))
+        print(numbers.get_many([5, 6, 45]))
+        # print(compare_bulk(1000000))
+    # for probing in HashTable.PROBING:
+    #     print(probing, lookup_latency(probing, 100000, max_load=0.9))
+    del table[93]
+    print(table.pop(17), table.pop(19, None))
+    shared = ShardedHashTable(shards=4)
+    for word in "the quick brown fox".split():
+        shared.setdefault(word, len(word))
+    shared.update_if("fox", 0, lambda current: current == 3)
+    print(sorted(shared.items()))
+    print(len(table), table.capacity, table.load_factor)
+    counted = HashTable(track_stats=True)
+    for i in range(1000):
+        counted[i] = i
+    for i in range(2000):
+        counted.get(i)
+    print(counted.stats())
+    print([churn_resizes(n) for n in (49, 200, 395)])
@@ -494,7 +494,6 @@ class DoublyList:
         predecessor.next = new_item
         successor.prev = new_item
         self._length += 1
-        self._index_correct(self._header.next)
         return new_item
 
     def _delete_node(self, node):
@@ -503,21 +502,12 @@ class DoublyList:
         predecessor.next = successor
         successor.prev = predecessor
         self._length -= 1
-        self._index_correct(self._header.next)
         return node
 
     @classmethod
     def fromiter(cls, iterable):
         return cls(*iterable)
 
-    @staticmethod
-    def _index_correct(value):
-        position = 0
-        while value is not None:
-            value.position = position
-            position += 1
-            value = value.next
-
 
 class UnorderedList(LinkedList):
     def __init__(self, *args):
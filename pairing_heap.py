@@ -0,0 +1,173 @@
+import random
+from time import perf_counter
+
+from structures.binary_heap import BinaryHeap
+
+
+class PairingHeap:
+    """
+    A meldable min-heap with the BinaryHeap interface.
+
+    The heap is a single tree whose root holds the minimum. insert and meld
+    just link two roots, so they are O(1); del_min re-pairs the root's
+    children in two passes for amortized O(log n), and so does decrease_key,
+    which cuts the node's subtree out and links it back to the root.
+
+    insert(k) adds a new item and returns its node, for decrease_key.
+    find_min() returns the smallest item, leaving it in the heap.
+    del_min() removes and returns the smallest item.
+    decrease_key(node, k) lowers the item of a node still in the heap.
+    meld(heap) moves every item of another PairingHeap into this one.
+    build_heap(list) builds a new heap from a list of keys.
+    """
+
+    class _Node:
+        __slots__ = ("item", "child", "sibling", "prev")
+
+        def __init__(self, item):
+            self.item = item
+            self.child = None
+            self.sibling = None
+            self.prev = None            # parent if leftmost child, else left sibling
+
+        def __repr__(self):
+            return "Node(%r)" % (self.item,)
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __repr__(self):
+        return "PairingHeap(%s)" % ("" if self._root is None else "min=%r, size=%d" % (self._root.item, self._size))
+
+    def __len__(self):
+        return self._size
+
+    def is_empty(self):
+        return self._size == 0
+
+    def size(self):
+        return self._size
+
+    def find_min(self):
+        if self._root is None:
+            raise IndexError("find_min from an empty heap")
+        return self._root.item
+
+    def insert(self, new_item):
+        node = self._Node(new_item)
+        self._root = self._link(self._root, node)
+        self._size += 1
+        return node
+
+    def build_heap(self, alist):
+        self._root, self._size = None, 0
+        for item in alist:
+            self.insert(item)
+
+    def meld(self, other):
+        """Move every item of other into this heap, leaving other empty."""
+        if other is self:
+            return
+        self._root = self._link(self._root, other._root)
+        self._size += other._size
+        other._root, other._size = None, 0
+
+    def del_min(self):
+        root = self._root
+        if root is None:
+            raise IndexError("del_min from an empty heap")
+        self._root = self._pair(root.child)
+        self._size -= 1
+        root.child = None
+        return root.item
+
+    def decrease_key(self, node, new_item):
+        if node.item < new_item:
+            raise ValueError("new item is larger than the current one")
+        node.item = new_item
+        if node is self._root:
+            return
+        if node.prev.child is node:         # cut node's subtree out of the tree
+            node.prev.child = node.sibling
+        else:
+            node.prev.sibling = node.sibling
+        if node.sibling is not None:
+            node.sibling.prev = node.prev
+        node.sibling = node.prev = None
+        self._root = self._link(self._root, node)
+
+    @staticmethod
+    def _link(a, b):
+        """Make the larger of two roots the leftmost child of the smaller one."""
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if b.item < a.item:
+            a, b = b, a
+        b.prev = a
+        b.sibling = a.child
+        if a.child is not None:
+            a.child.prev = b
+        a.child = b
+        return a
+
+    def _pair(self, first):
+        """Link a list of siblings into one tree: pairwise left to right, then right to left."""
+        pairs = []
+        node = first
+        while node is not None:
+            a, b = node, node.sibling
+            if b is None:
+                node = None
+            else:
+                node = b.sibling
+                b.sibling = b.prev = None
+            a.sibling = a.prev = None
+            pairs.append(self._link(a, b))
+        root = pairs.pop() if pairs else None
+        while pairs:
+            root = self._link(pairs.pop(), root)
+        return root
+
+
+def compare_merge(workers=8, n=20000):
+    """Time merging per-worker queues of n items each into one queue."""
+    data = [[random.random() for _ in range(n)] for _ in range(workers)]
+
+    heaps = [PairingHeap() for _ in data]
+    for heap, items in zip(heaps, data):
+        heap.build_heap(items)
+    start = perf_counter()
+    for heap in heaps[1:]:
+        heaps[0].meld(heap)
+    print("PairingHeap.meld   %.6f" % (perf_counter() - start))
+
+    heaps = [BinaryHeap() for _ in data]
+    for heap, items in zip(heaps, data):
+        heap.build_heap(items)
+    start = perf_counter()
+    for heap in heaps[1:]:
+        heaps[0].merge(heap)
+    print("BinaryHeap.merge   %.6f" % (perf_counter() - start))
+
+    for name, heap in [("PairingHeap", PairingHeap()), ("BinaryHeap", BinaryHeap())]:
+        heap.build_heap(data[0])
+        start = perf_counter()
+        for _ in range(n):
+            heap.del_min()
+        print("%-18s %.6f for %d del_min" % (name, perf_counter() - start, n))
+
+
+if __name__ == "__main__":
+    ph = PairingHeap()
+    nodes = [ph.insert(x) for x in [5, 10, 1, 20, 0]]
+    other = PairingHeap()
+    other.build_heap([7, 3])
+    ph.meld(other)
+    ph.decrease_key(nodes[3], -1)
+    print(ph)
+    print([ph.del_min() for _ in range(ph.size())])
+
+    # compare_merge()
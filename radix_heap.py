@@ -0,0 +1,129 @@
+import operator
+import random
+from time import perf_counter
+
+from structures.binary_heap import BinaryHeap
+
+
+class RadixHeap:
+    """
+    A monotone priority queue for non-negative integer keys, with the
+    BinaryHeap interface.
+
+    Keys may never drop below the last key removed, which holds for event
+    simulation and Dijkstra. Bucket b holds the items whose key first differs
+    from that last key in bit b - 1, so insert is a bit_length with no
+    comparisons at all; del_min only has to scan a bucket when bucket 0 runs
+    dry, and each item moves down a bucket at most O(log C) times, C being
+    the largest key.
+
+    RadixHeap(key=f) orders items by the integer f(item).
+    insert(k) adds a new item, whose key must not be below the last removed.
+    find_min() returns an item with the smallest key, leaving it in the heap.
+    del_min() removes and returns an item with the smallest key.
+    build_heap(list) builds a new heap from a list of keys.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self._buckets = [[] for _ in range(65)]
+        self._last = 0              # key of the last item removed
+        self._size = 0
+
+    def __repr__(self):
+        return "RadixHeap(last=%d, size=%d)" % (self._last, self._size)
+
+    def __len__(self):
+        return self._size
+
+    def is_empty(self):
+        return self._size == 0
+
+    def size(self):
+        return self._size
+
+    def insert(self, new_item):
+        k = new_item if self.key is None else self.key(new_item)
+        if k < self._last:
+            raise ValueError("key %d is below the last removed key %d" % (k, self._last))
+        b = (k ^ self._last).bit_length()
+        if b >= len(self._buckets):
+            self._buckets.extend([] for _ in range(b + 1 - len(self._buckets)))
+        self._buckets[b].append((k, new_item))
+        self._size += 1
+
+    def build_heap(self, alist):
+        self._buckets = [[] for _ in range(65)]
+        self._last = 0
+        self._size = 0
+        for item in alist:
+            self.insert(item)
+
+    def find_min(self):
+        self._refill()
+        return self._buckets[0][-1][1]
+
+    def del_min(self):
+        self._refill()
+        self._size -= 1
+        return self._buckets[0].pop()[1]
+
+    def _refill(self):
+        """Make sure bucket 0 holds the smallest key, redistributing one bucket if not."""
+        buckets = self._buckets
+        if buckets[0]:
+            return
+        if self._size == 0:
+            raise IndexError("del_min from an empty heap")
+        b = 1
+        while not buckets[b]:
+            b += 1
+        entries = buckets[b]
+        buckets[b] = []
+        last = self._last = min([entry[0] for entry in entries])
+        for entry in entries:       # each lands in a lower bucket than b
+            buckets[(entry[0] ^ last).bit_length()].append(entry)
+
+
+def _random_graph(nodes, degree, max_weight):
+    return [[(random.randrange(nodes), random.randint(1, max_weight)) for _ in range(degree)]
+            for _ in range(nodes)]
+
+
+def _dijkstra(graph, heap):
+    """Lazy-deletion Dijkstra from node 0 over (distance, node) tuples."""
+    dist = [None] * len(graph)
+    heap.insert((0, 0))
+    while not heap.is_empty():
+        d, node = heap.del_min()
+        if dist[node] is not None:
+            continue
+        dist[node] = d
+        for neighbor, weight in graph[node]:
+            if dist[neighbor] is None:
+                heap.insert((d + weight, neighbor))
+    return dist
+
+
+def compare_dijkstra(nodes=50000, degree=8, max_weight=1000):
+    """Time Dijkstra's priority-queue traffic on a random graph with each heap."""
+    graph = _random_graph(nodes, degree, max_weight)
+    results = []
+    for name, heap in [("BinaryHeap", BinaryHeap()),
+                       ("BinaryHeap(arity=4)", BinaryHeap(4)),
+                       ("RadixHeap", RadixHeap(key=operator.itemgetter(0)))]:
+        start = perf_counter()
+        results.append(_dijkstra(graph, heap))
+        print("%-20s %.4f" % (name, perf_counter() - start))
+    assert all(r == results[0] for r in results)
+
+
+if __name__ == "__main__":
+    rh = RadixHeap()
+    rh.build_heap([5, 10, 1, 20, 0])
+    print(rh.del_min(), rh.del_min())
+    rh.insert(3)
+    print(rh)
+    print([rh.del_min() for _ in range(rh.size())])
+
+    # compare_dijkstra()
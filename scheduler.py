@@ -0,0 +1,360 @@
+import asyncio
+import math
+import operator
+import random
+import threading
+import time
+from time import perf_counter
+
+from structures.binary_heap import BinaryHeap
+
+
+_IN_HEAP = "heap"       # where a pending timer lives when it is not in a wheel slot
+_READY = "ready"
+
+
+class Timer:
+    """A scheduled callback, returned by Scheduler.call_later and call_at."""
+
+    __slots__ = ("when", "callback", "args", "cancelled", "_tick", "_seq", "_slot", "_level", "_scheduler")
+
+    def __init__(self, scheduler, when, tick, seq, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._tick = tick           # first tick at or after when
+        self._seq = seq
+        self._slot = None           # wheel slot, _IN_HEAP or _READY; None once run or cancelled
+        self._level = 0
+        self._scheduler = scheduler
+
+    def __repr__(self):
+        state = "cancelled" if self.cancelled else "pending" if self._slot is not None else "done"
+        return "Timer(%.3f, %r, %s)" % (self.when, self.callback, state)
+
+    def cancel(self):
+        return self._scheduler.cancel(self)
+
+
+class Scheduler:
+    """
+    Delayed callbacks on a hierarchical timing wheel, with a BinaryHeap for
+    timers beyond the wheel's horizon.
+
+    Time is cut into ticks of resolution seconds. Level k of the wheel has
+    2**slot_bits slots each spanning 2**(slot_bits*k) ticks, so scheduling
+    is one set insert and cancelling one set removal, both O(1); slots of a
+    higher level are cascaded into the levels below as time reaches them.
+    Only timers past the horizon of levels * slot_bits bits of ticks go to
+    the heap, where cancelled entries are dropped when they reach the wheel
+    and the heap is rebuilt once most of it is cancelled.
+
+    Timers never fire early and at most one resolution late; run_due(now)
+    runs every due timer in a batch, ordered by deadline. All methods are
+    thread-safe, and callbacks run outside the lock, so they may schedule
+    and cancel. Drive it from a thread with run() or from an asyncio loop
+    with run_async(), and end either with stop().
+
+    call_later(delay, callback, *args) schedules a callback delay seconds from now.
+    call_at(when, callback, *args) schedules it at a clock() time.
+    cancel(timer) unschedules a pending timer.
+    run_due(now) runs the timers due at now and returns how many ran.
+    next_deadline() returns a time no later than the next timer is due.
+    """
+
+    def __init__(self, resolution=0.001, slot_bits=8, levels=3, clock=time.monotonic):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.resolution = resolution
+        self._clock = clock
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = levels
+        self._horizon = 1 << (slot_bits * levels)
+        self._wheel = [[set() for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._counts = [0] * levels
+        self._heap = BinaryHeap(key=operator.attrgetter("_tick"))
+        self._heap_cancelled = 0
+        self._ready = []
+        self._tick = self._tick_of(clock())     # every tick before this one has been run
+        self._seq = 0
+        self._live = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._wake_at = math.inf                # when run() or run_async() will next look
+        self._async_wakeup = None
+        self._stopped = False
+
+    def __repr__(self):
+        return "Scheduler(pending=%d, resolution=%g)" % (self._live, self.resolution)
+
+    def __len__(self):
+        return self._live
+
+    def clock(self):
+        return self._clock()
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self._clock() + delay, callback, *args)
+
+    def call_at(self, when, callback, *args):
+        with self._lock:
+            self._seq += 1
+            timer = Timer(self, when, math.ceil(when / self.resolution), self._seq, callback, args)
+            self._place(timer)
+            self._live += 1
+            if when < self._wake_at:
+                self._notify(when)
+        return timer
+
+    def cancel(self, timer):
+        """Cancel timer, returning False if it has already run or been cancelled."""
+        with self._lock:
+            if timer._slot is None:
+                return False
+            if timer._slot is _IN_HEAP:
+                self._heap_cancelled += 1
+                if self._heap_cancelled > 64 and self._heap_cancelled * 2 > self._heap.size():
+                    self._compact_heap()
+            elif timer._slot is not _READY:
+                timer._slot.discard(timer)
+                self._counts[timer._level] -= 1
+            timer.cancelled = True
+            timer._slot = None
+            self._live -= 1
+            return True
+
+    def run_due(self, now=None):
+        """Run every pending timer due at now, earliest first, and return how many ran.
+
+        now defaults to clock() and must not go backwards between calls.
+        """
+        with self._lock:
+            if now is None:
+                now = self._clock()
+            due, self._ready = self._ready, []
+            self._advance(math.floor(now / self.resolution) + 1, due)
+        due.sort(key=operator.attrgetter("when", "_seq"))
+        ran = 0
+        for i, timer in enumerate(due):
+            with self._lock:
+                if timer.cancelled:     # by a callback earlier in this batch
+                    continue
+                timer._slot = None
+                self._live -= 1
+            try:
+                timer.callback(*timer.args)
+            except BaseException:
+                with self._lock:        # keep the rest of the batch for the next call
+                    self._ready.extend(t for t in due[i + 1:] if not t.cancelled)
+                raise
+            ran += 1
+        return ran
+
+    def next_deadline(self):
+        """Return a time no later than the earliest pending timer, or None if there is none."""
+        with self._lock:
+            return self._next_deadline()
+
+    def stop(self):
+        """Make run() or run_async() return after their current batch.
+
+        stop() is sticky: if nothing is running yet, the next run() or
+        run_async() returns as soon as it starts. Each stop ends one run.
+        """
+        with self._lock:
+            self._stopped = True
+            self._notify(-math.inf)
+
+    def run(self):
+        """Run timers as they fall due in the calling thread until stop() is called."""
+        while True:
+            with self._lock:
+                while not self._stopped:
+                    deadline = self._next_deadline()
+                    timeout = None if deadline is None else deadline - self._clock()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._wake_at = math.inf if deadline is None else deadline
+                    self._cond.wait(timeout)
+                self._wake_at = math.inf
+                if self._stopped:
+                    self._stopped = False
+                    return
+            self.run_due()
+
+    async def run_async(self):
+        """Run timers as they fall due on the running event loop until stop() is called."""
+        wakeup = asyncio.Event()
+        self._async_wakeup = (asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                with self._lock:
+                    if self._stopped:
+                        self._stopped = False
+                        return
+                    deadline = self._next_deadline()
+                    self._wake_at = math.inf if deadline is None else deadline
+                    wakeup.clear()
+                timeout = None if deadline is None else deadline - self._clock()
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                self.run_due()
+        finally:
+            self._async_wakeup = None
+            self._wake_at = math.inf
+
+    def _tick_of(self, t):
+        return math.floor(t / self.resolution) + 1
+
+    def _notify(self, when):
+        """Wake run() or run_async() if they sleep past when."""
+        self._wake_at = when
+        self._cond.notify_all()
+        if self._async_wakeup is not None:
+            loop, wakeup = self._async_wakeup
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _place(self, timer):
+        """File timer in the ready list, the wheel level its distance calls for, or the heap."""
+        delta = timer._tick - self._tick
+        if delta < 0:
+            timer._slot = _READY
+            self._ready.append(timer)
+        elif delta < self._horizon:
+            level = (delta.bit_length() - 1) // self._bits if delta else 0
+            slot = self._wheel[level][(timer._tick >> (self._bits * level)) & self._mask]
+            slot.add(timer)
+            timer._slot = slot
+            timer._level = level
+            self._counts[level] += 1
+        else:
+            timer._slot = _IN_HEAP
+            self._heap.insert(timer)
+
+    def _advance(self, target, due):
+        """Move every tick before target, appending the timers they hold to due."""
+        heap, counts, bits = self._heap, self._counts, self._bits
+        while self._tick < target:
+            while heap.current_size and heap.find_min()._tick - self._tick < self._horizon:
+                timer = heap.del_min()
+                if timer.cancelled:
+                    self._heap_cancelled -= 1
+                else:
+                    self._place(timer)
+            level = next((k for k in range(self._levels) if counts[k]), None)
+            if level is None:           # empty wheel: jump to target or the heap's horizon
+                if heap.current_size:
+                    target_or_heap = heap.find_min()._tick - self._horizon + 1
+                    self._tick = max(self._tick + 1, min(target, target_or_heap))
+                else:
+                    self._tick = target
+                continue
+            if level == 0:
+                index = self._tick & self._mask
+                slot = self._wheel[0][index]
+                if slot:
+                    self._wheel[0][index] = set()
+                    counts[0] -= len(slot)
+                    for timer in slot:
+                        timer._slot = _READY
+                    due.extend(slot)
+                self._tick += 1
+            else:                       # lower levels are empty: skip to the next cascade
+                span = 1 << (bits * level)
+                boundary = (self._tick // span + 1) * span
+                if boundary > target:
+                    self._tick = target
+                    return
+                self._tick = boundary
+            if self._tick & self._mask == 0:
+                self._cascade()
+
+    def _cascade(self):
+        """Redistribute the slots whose span begins at the current tick, highest level first."""
+        tick, bits = self._tick, self._bits
+        top = 1
+        while top < self._levels and tick & ((1 << (bits * (top + 1))) - 1) == 0:
+            top += 1
+        for level in range(min(top, self._levels - 1), 0, -1):
+            index = (tick >> (bits * level)) & self._mask
+            slot = self._wheel[level][index]
+            if slot:
+                self._wheel[level][index] = set()
+                self._counts[level] -= len(slot)
+                for timer in slot:
+                    self._place(timer)
+
+    def _next_deadline(self):
+        if self._ready:
+            return min(timer.when for timer in self._ready)
+        ticks = []
+        if self._counts[0]:
+            ticks.append(next(tick for tick in range(self._tick, self._tick + self._mask + 1)
+                              if self._wheel[0][tick & self._mask]))
+        for level in range(1, self._levels):
+            if self._counts[level]:     # nothing here is due before the next cascade
+                span = 1 << (self._bits * level)
+                ticks.append((self._tick // span + 1) * span)
+                break
+        if self._heap.current_size:
+            ticks.append(self._heap.find_min()._tick)
+        return min(ticks) * self.resolution if ticks else None
+
+    def _compact_heap(self):
+        """Rebuild the heap without its cancelled timers."""
+        self._heap.build_heap([timer for timer in self._heap._items() if not timer.cancelled])
+        self._heap_cancelled = 0
+
+
+def compare_cancel(n=200000, cancel=0.9, max_delay=30.0):
+    """Schedule n timeouts, cancel most of them and fire the rest, against a lazy-cancel BinaryHeap."""
+    delays = [random.uniform(0, max_delay) for _ in range(n)]
+    doomed = random.sample(range(n), int(n * cancel))
+    fired = []
+
+    start = perf_counter()
+    scheduler = Scheduler(clock=lambda: 0.0)
+    timers = [scheduler.call_at(delay, fired.append, i) for i, delay in enumerate(delays)]
+    for i in doomed:
+        timers[i].cancel()
+    scheduler.run_due(max_delay)
+    print("Scheduler            %.4f, %d fired" % (perf_counter() - start, len(fired)))
+
+    start = perf_counter()
+    heap = BinaryHeap()
+    entries = [[delay, i, False] for i, delay in enumerate(delays)]
+    for entry in entries:
+        heap.insert(entry)
+    peak = heap.size()
+    for i in doomed:
+        entries[i][2] = True
+    count = 0
+    while not heap.is_empty():
+        delay, i, cancelled = heap.del_min()
+        if not cancelled:
+            count += 1
+    print("BinaryHeap, lazy     %.4f, %d fired, %d entries held" % (perf_counter() - start, count, peak))
+
+
+if __name__ == "__main__":
+    s = Scheduler()
+    now = s.clock()
+    for delay in [0.05, 0.01, 0.03, 5000.0]:
+        s.call_at(now + delay, print, "timer", delay)
+    s.call_at(now + 0.02, print, "never").cancel()
+    print(s, s.run_due(now + 0.04))
+
+    async def demo():
+        loop_scheduler = Scheduler()
+        loop_scheduler.call_later(0.02, print, "from asyncio")
+        loop_scheduler.call_later(0.03, loop_scheduler.stop)
+        await loop_scheduler.run_async()
+
+    asyncio.run(demo())
+
+    # compare_cancel()